@@ -1,15 +1,21 @@
 import os
-import pandas as pd
+import sys
+import argparse
 from pathlib import Path
 from collections import defaultdict
 import warnings
-import tkinter as tk
-from tkinter import filedialog, messagebox
 import re
+from PAS_Common import RATING_DATABASE_NAME, RatingDatabase, find_dataset_files, lazy_import
 warnings.filterwarnings('ignore')
 
+# pandas loads on first use, so argument parsing doesn't wait for it
+pd = lazy_import('pandas')
+
 def select_folder():
     """Open a dialog window to select the PwD dataset folder"""
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
+    
     root = tk.Tk()
     root.withdraw()  # Hide the main window
     root.title("Select PwD Dataset Folder")
@@ -59,14 +65,13 @@ def extract_patient_id(folder_name):
         return ' '.join(parts[-2:])
     return folder_name
 
-def find_csv_files(root_folder):
+def find_csv_files(root_folder, database=None):
     """Find all CSV files ending with 'Observations_with_Pittsburgh_Scale.csv'"""
-    csv_files = []
-    for root, dirs, files in os.walk(root_folder):
-        for file in files:
-            if file.endswith("Observations_with_Pittsburgh_Scale.csv"):
-                csv_files.append(os.path.join(root, file))
-    return csv_files
+    if database is not None:
+        # Files stored in the rating database, under their rated copies' paths
+        return database.files()
+    # The dataset's file index only re-lists folders that changed since the last run
+    return find_dataset_files(root_folder, "Observations_with_Pittsburgh_Scale.csv")
 
 def is_valid_song_name(song_name):
     """Check if the entry is a valid song name (not just dashes or empty)"""
@@ -109,10 +114,10 @@ def normalize_song_name(song_name):
     
     return normalized
 
-def analyze_songs_and_scores(csv_file):
-    """Analyze a single CSV file for songs with/without scores"""
+def analyze_songs_and_scores(csv_file, database=None):
+    """Analyze a single CSV file (or its rows in the rating database) for songs with/without scores"""
     try:
-        df = pd.read_csv(csv_file)
+        df = database.read_file(csv_file) if database is not None else pd.read_csv(csv_file)
         
         # Identify columns
         song_columns = [col for col in df.columns if 'song' in col.lower() or 'music' in col.lower()]
@@ -175,6 +180,9 @@ def analyze_songs_and_scores(csv_file):
 
 def show_completion_message(output_file):
     """Show a completion message with the output file location"""
+    import tkinter as tk
+    from tkinter import messagebox
+    
     root = tk.Tk()
     root.withdraw()
     messagebox.showinfo(
@@ -183,38 +191,74 @@ def show_completion_message(output_file):
     )
     root.destroy()
 
-def main():
-    # Get the dataset folder using file dialog
+def show_no_files_message():
+    """Tell the user that the selected folder holds no observation files"""
+    import tkinter as tk
+    from tkinter import messagebox
+    
+    root = tk.Tk()
+    root.withdraw()
+    messagebox.showerror(
+        "No Files Found",
+        "No CSV files ending with 'Observations_with_Pittsburgh_Scale.csv' were found in the selected folder and its subfolders."
+    )
+    root.destroy()
+
+def parse_args(argv=None):
+    """Parse the command line; without a folder the tool falls back to dialogs"""
+    parser = argparse.ArgumentParser(
+        description="Report songs without a Pittsburgh score, aggregated by session.")
+    parser.add_argument('folder', nargs='?',
+                        help="PwD dataset folder to analyze; a folder dialog opens if omitted")
+    parser.add_argument('-o', '--output',
+                        help="report file to write (default: song_score_analysis_by_session.txt in the folder)")
+    parser.add_argument('--db', action='store_true',
+                        help=f"read the rated files from the folder's {RATING_DATABASE_NAME} database")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    
     print("=" * 60)
     print("**Song Score Analysis Tool**")
     print("=" * 60)
-    print("\nA folder selection window will appear...")
     
-    pwd_folder = select_folder()
+    # Without a folder argument, get the dataset folder using file dialog
+    interactive = args.folder is None
+    if interactive:
+        print("\nA folder selection window will appear...")
+        pwd_folder = select_folder()
+    else:
+        pwd_folder = args.folder
     
     if not pwd_folder:
         print("No folder selected. Exiting...")
-        return
+        return 1
     
     if not os.path.exists(pwd_folder):
         print(f"Error: The folder '{pwd_folder}' does not exist!")
-        return
+        return 1
+    
+    # Read the rated files from the rating database instead of their CSV copies
+    database = None
+    if args.db:
+        if not os.path.exists(os.path.join(pwd_folder, RATING_DATABASE_NAME)):
+            print(f"Error: No rating database ({RATING_DATABASE_NAME}) in '{pwd_folder}'!")
+            return 1
+        database = RatingDatabase(pwd_folder, create=False)
     
     # Find all relevant CSV files
     print(f"\nSelected folder: {pwd_folder}")
     print(f"Searching for CSV files...")
-    csv_files = find_csv_files(pwd_folder)
+    csv_files = find_csv_files(pwd_folder, database)
     
     if not csv_files:
+        if database is not None:
+            database.close()
         print("No CSV files ending with 'Observations_with_Pittsburgh_Scale.csv' found!")
-        root = tk.Tk()
-        root.withdraw()
-        messagebox.showerror(
-            "No Files Found",
-            "No CSV files ending with 'Observations_with_Pittsburgh_Scale.csv' were found in the selected folder and its subfolders."
-        )
-        root.destroy()
-        return
+        if interactive:
+            show_no_files_message()
+        return 1
     
     print(f"Found {len(csv_files)} CSV file(s) to analyze")
     print("Note: Entries with '—' or similar dashes will be skipped")
@@ -225,16 +269,18 @@ def main():
     total_skipped = 0
     for csv_file in csv_files:
         print(f"Processing: {os.path.basename(csv_file)}")
-        result = analyze_songs_and_scores(csv_file)
+        result = analyze_songs_and_scores(csv_file, database)
         if result is not None:
             all_results.append(result)
             if result['skipped_entries'] > 0:
                 print(f"  → Skipped {result['skipped_entries']} non-song entries (dashes, etc.)")
             total_skipped += result.get('skipped_entries', 0)
+    if database is not None:
+        database.close()
     
     if not all_results:
         print("\nNo valid data found in the CSV files.")
-        return
+        return 1
     
     # Group results by session
     sessions_data = defaultdict(lambda: {
@@ -353,7 +399,7 @@ def main():
         print(f"Overall completion rate: {total_with_scores/(total_with_scores + total_without_scores)*100:.1f}%")
     
     # Save results to file
-    output_file = os.path.join(pwd_folder, "song_score_analysis_by_session.txt")
+    output_file = args.output or os.path.join(pwd_folder, "song_score_analysis_by_session.txt")
     
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
@@ -407,10 +453,14 @@ def main():
                 f.write(f"Overall completion rate: {total_with_scores/(total_with_scores + total_without_scores)*100:.1f}%\n")
         
         print(f"\n\nResults saved to: {output_file}")
-        show_completion_message(output_file)
+        if interactive:
+            show_completion_message(output_file)
         
     except Exception as e:
         print(f"\nError saving results to file: {str(e)}")
+        return 1
+    
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
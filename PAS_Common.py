@@ -0,0 +1,435 @@
+import importlib.util
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, datetime
+
+
+def lazy_import(name):
+    """Return a module that is only executed on first attribute access.
+
+    pandas, numpy and matplotlib take most of the startup time of every tool,
+    so they are bound at import time but not loaded until actually used.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+np = lazy_import('numpy')
+pd = lazy_import('pandas')
+
+# Supported time formats, in the order they are tried for a single value.
+# Each entry pairs the strptime format with an equivalent anchored regex
+# so a whole column can be converted at once.
+TIME_FORMATS = [
+    ('%H:%M:%S',    r'^(\d{1,2}):(\d{1,2}):(\d{1,2})$'),            # 14:30:45
+    ('%H:%M',       r'^(\d{1,2}):(\d{1,2})$'),                      # 14:30
+    ('%I:%M %p',    r'^(\d{1,2}):(\d{1,2})\s+([AaPp][Mm])$'),       # 2:30 PM
+    ('%I:%M:%S %p', r'^(\d{1,2}):(\d{1,2}):(\d{1,2})\s+([AaPp][Mm])$'),  # 2:30:45 PM
+    ('%H.%M.%S',    r'^(\d{1,2})\.(\d{1,2})\.(\d{1,2})$'),          # 14.30.45
+    ('%H.%M',       r'^(\d{1,2})\.(\d{1,2})$'),                     # 14.30
+]
+
+MONTH_NAMES = ['january', 'february', 'march', 'april', 'may', 'june',
+               'july', 'august', 'september', 'october', 'november', 'december']
+
+# Session folders are named like "August 5 Morning AN 000133", optionally with a year
+SESSION_DATE_PATTERN = r'\b(' + '|'.join(MONTH_NAMES) + r')\s+(\d{1,2})\b'
+YEAR_PATTERN = r'\b((?:19|20)\d{2})\b'
+
+# Number of values inspected when detecting a column's time format
+SNIFF_SAMPLE_SIZE = 50
+
+# Cached listing of a dataset's CSV files, kept in the dataset root
+FILE_INDEX_NAME = '.pas_file_index.json'
+FILE_INDEX_VERSION = 1
+
+# A directory modified this recently is listed again on the next refresh,
+# since a further change within the filesystem's mtime granularity would go unnoticed
+MTIME_SETTLE_SECONDS = 2
+
+# Optional single-file store of the ratings of a whole dataset, kept in the dataset root
+RATING_DATABASE_NAME = '.pas_ratings.sqlite'
+
+# Columns the Helper writes for every row, stored as typed SQLite columns
+RATING_VALUE_COLUMNS = ['Aberrant_Vocalization', 'Motor_Agitation', 'Aggressiveness',
+                        'Resisting_Care', 'Duration_Seconds']
+
+RATING_DATABASE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,      -- rated copy's path relative to the dataset root
+    columns TEXT NOT NULL,          -- JSON list of the file's columns, in order
+    revision INTEGER NOT NULL       -- bumped on every write
+);
+CREATE TABLE IF NOT EXISTS observations (
+    file_id INTEGER NOT NULL REFERENCES files(id),
+    row INTEGER NOT NULL,
+    cells TEXT NOT NULL,            -- JSON list of the row's other values
+    Aberrant_Vocalization INTEGER,
+    Motor_Agitation INTEGER,
+    Aggressiveness INTEGER,
+    Resisting_Care INTEGER,
+    Duration_Seconds REAL,
+    PRIMARY KEY (file_id, row)
+) WITHOUT ROWID;
+"""
+
+
+def parse_time_to_seconds(time_str):
+    """Convert a single time value to seconds from start of day"""
+    if pd.isna(time_str) or time_str == '':
+        return None
+
+    time_str = str(time_str).strip()
+
+    # Try different time formats
+    for fmt, _ in TIME_FORMATS:
+        try:
+            time_obj = datetime.strptime(time_str, fmt)
+            # Calculate seconds from midnight
+            return time_obj.hour * 3600 + time_obj.minute * 60 + time_obj.second
+        except ValueError:
+            continue
+
+    # Try to extract numbers for minutes:seconds format (e.g., "5:30" meaning 5 min 30 sec)
+    match = re.match(r'(\d+):(\d+)', time_str)
+    if match:
+        minutes = int(match.group(1))
+        seconds = int(match.group(2))
+        if minutes < 60:  # Likely minutes:seconds rather than hours:minutes
+            return minutes * 60 + seconds
+
+    # Try to parse as just seconds
+    try:
+        return float(time_str)
+    except ValueError:
+        return None
+
+
+def detect_time_format(time_strings):
+    """Return the (format, regex) entry matching most of a sample of time strings, or None"""
+    sample = time_strings.head(SNIFF_SAMPLE_SIZE)
+    if sample.empty:
+        return None
+
+    best, best_count = None, 0
+    for entry in TIME_FORMATS:
+        count = int(sample.str.match(entry[1]).sum())
+        if count > best_count:
+            best, best_count = entry, count
+    return best
+
+
+def _seconds_from_match(parts, fmt):
+    """Convert regex groups of a matched time format to seconds, NaN where out of range"""
+    fields = parts.apply(pd.to_numeric, errors='coerce')
+    hours = fields[0].to_numpy(dtype=float)
+    minutes = fields[1].to_numpy(dtype=float)
+    seconds = fields[2].to_numpy(dtype=float) if '%S' in fmt else np.zeros(len(fields))
+
+    if '%p' in fmt:
+        valid = (hours >= 1) & (hours <= 12)
+        is_pm = parts[parts.columns[-1]].str.upper().eq('PM').to_numpy()
+        hours = hours % 12 + np.where(is_pm, 12, 0)
+    else:
+        valid = hours <= 23
+    valid &= (minutes <= 59) & (seconds <= 59)
+
+    return np.where(valid, hours * 3600 + minutes * 60 + seconds, np.nan)
+
+
+def parse_time_column(values):
+    """Convert a column of time values to seconds from start of day.
+
+    The column's format is detected once from a sample and the matching rows
+    are converted in a single vectorized pass; only rows that don't match fall
+    back to parse_time_to_seconds. Unparseable values become NaN.
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    result = np.full(len(values), np.nan)
+
+    present = values.notna() & values.astype(str).ne('')
+    time_strings = values[present].astype(str).str.strip()
+
+    entry = detect_time_format(time_strings)
+    if entry is not None:
+        fmt, pattern = entry
+        parts = time_strings.str.extract(pattern)
+        matched = parts[0].notna()
+        if matched.any():
+            result[time_strings.index[matched]] = _seconds_from_match(parts[matched], fmt)
+        pending = time_strings.index[~matched | np.isnan(result[time_strings.index])]
+    else:
+        pending = time_strings.index
+
+    # Per-cell fallback for rows in any other format
+    for idx in pending:
+        seconds = parse_time_to_seconds(values.iat[idx])
+        if seconds is not None:
+            result[idx] = seconds
+
+    return result
+
+
+def session_date_from_path(path):
+    """Return the session date named in a file's folders.
+
+    Folder names carry the month and day but usually no year, so the year is
+    taken from any folder that names one, otherwise from the file's
+    modification time. Files without a dated folder use their modification date.
+    A rated copy that only exists in the rating database goes by the
+    observation file it was rated from, or else its folder.
+    """
+    fallback = date(1970, 1, 1)
+    folder, name = os.path.split(path)
+    for candidate in (path, os.path.join(folder, name.replace('_with_Pittsburgh_Scale', '')), folder):
+        try:
+            fallback = datetime.fromtimestamp(os.path.getmtime(candidate)).date()
+            break
+        except OSError:
+            continue
+
+    parts = os.path.normpath(os.path.dirname(os.path.abspath(path))).split(os.sep)
+    years = [int(m.group(1)) for part in parts for m in [re.search(YEAR_PATTERN, part)] if m]
+    year = years[-1] if years else fallback.year
+
+    for part in reversed(parts):
+        match = re.search(SESSION_DATE_PATTERN, part, re.IGNORECASE)
+        if match:
+            try:
+                return date(year, MONTH_NAMES.index(match.group(1).lower()) + 1, int(match.group(2)))
+            except ValueError:
+                continue
+    return fallback
+
+
+def temp_path_for(path):
+    """Return a temporary file name next to path, unique to this thread so concurrent writers never share one"""
+    return f"{path}.{os.getpid()}-{threading.get_ident()}.tmp"
+
+
+def write_json_atomic(path, data):
+    """Write JSON to a temporary file and rename it over path, so readers never see a partial file"""
+    temp_path = temp_path_for(path)
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=1)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def write_csv_atomic(path, df):
+    """Write a DataFrame as CSV to a temporary file and rename it over path, so a crash never leaves a truncated file"""
+    temp_path = temp_path_for(path)
+    with open(temp_path, 'w', encoding='utf-8', newline='') as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class DatasetIndex:
+    """Persistent listing of the CSV files under a dataset folder.
+    
+    For every directory the index records its mtime with the CSV files and
+    subdirectories it contained. Adding, removing or renaming an entry changes
+    its directory's mtime, so refresh() only re-lists directories whose mtime
+    changed and takes the rest from the index: an unchanged tree costs one
+    stat per directory instead of a full recursive listing.
+    """
+    
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, FILE_INDEX_NAME)
+        self.dirs = {}
+        
+    def load(self):
+        """Read the saved index; return True if there was one"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == FILE_INDEX_VERSION:
+                self.dirs = data.get('dirs', {})
+        except (OSError, ValueError):
+            pass  # Missing or unreadable index: the next refresh lists everything
+        return bool(self.dirs)
+    
+    def refresh(self):
+        """Bring the index up to date with the tree on disk; return True if anything changed"""
+        dirs = {}
+        changed = False
+        pending = ['']
+        while pending:
+            rel_dir = pending.pop()
+            full_dir = os.path.join(self.root, rel_dir)
+            try:
+                mtime_ns = os.stat(full_dir).st_mtime_ns
+            except OSError:
+                continue
+            
+            entry = self.dirs.get(rel_dir)
+            if entry is None or entry['mtime_ns'] != mtime_ns:
+                try:
+                    entry = self._list_dir(full_dir, mtime_ns)
+                except OSError:
+                    continue
+                changed = True
+            dirs[rel_dir] = entry
+            pending.extend(os.path.join(rel_dir, name) for name in entry['subdirs'])
+        
+        changed = changed or dirs.keys() != self.dirs.keys()
+        self.dirs = dirs
+        return changed
+    
+    def _list_dir(self, full_dir, mtime_ns):
+        files, subdirs = [], []
+        with os.scandir(full_dir) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.name)
+                    elif entry.name.lower().endswith('.csv') and entry.is_file():
+                        files.append(entry.name)
+                except OSError:
+                    continue
+        
+        settled = time.time_ns() - mtime_ns > MTIME_SETTLE_SECONDS * 10**9
+        return {'mtime_ns': mtime_ns if settled else None,
+                'files': sorted(files), 'subdirs': sorted(subdirs)}
+    
+    def files(self, suffix=''):
+        """Return the indexed CSV files whose names end with suffix, in path order"""
+        return [os.path.join(self.root, rel_dir, name)
+                for rel_dir in sorted(self.dirs)
+                for name in self.dirs[rel_dir]['files'] if name.endswith(suffix)]
+    
+    def save(self):
+        try:
+            write_json_atomic(self.path, {'version': FILE_INDEX_VERSION, 'dirs': self.dirs})
+        except OSError as e:
+            print(f"  Warning: could not save file index {self.path}: {e}")
+
+
+def find_dataset_files(root, suffix):
+    """Return the CSV files under root ending with suffix, using and updating the dataset's file index"""
+    index = DatasetIndex(root)
+    index.load()
+    if index.refresh():
+        index.save()
+    return index.files(suffix)
+
+
+class RatingDatabase:
+    """Ratings of a whole dataset in one SQLite file, keyed by (file, row).
+    
+    Stands in for the *_Observations_with_Pittsburgh_Scale.csv copies: each
+    file is stored under its rated copy's relative path, with every row's
+    values and ratings, and is replaced in a single transaction when the
+    Helper saves it. Readers get a file's rows through the (file, row)
+    primary key instead of finding and parsing its CSV copy. Connections
+    can't be shared between threads, so each thread opens its own.
+    """
+    
+    def __init__(self, root, create=True):
+        self.root = root
+        self.path = os.path.join(root, RATING_DATABASE_NAME)
+        if not create and not os.path.exists(self.path):
+            raise FileNotFoundError(f"No rating database ({RATING_DATABASE_NAME}) in {root}")
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        # Readers (the plotter, the finder) don't block the Helper's writes
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(RATING_DATABASE_SCHEMA)
+        
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+        
+    def close(self):
+        self.connection.close()
+        
+    def key(self, rated_path):
+        return os.path.relpath(rated_path, self.root)
+    
+    def write_file(self, rated_path, df):
+        """Replace a file's rows with those of a rated DataFrame, atomically"""
+        other_columns = [col for col in df.columns if col not in RATING_VALUE_COLUMNS]
+        cells = [json.dumps(row, ensure_ascii=False)
+                 for row in json.loads(df[other_columns].to_json(orient='values'))]
+        values = df.reindex(columns=RATING_VALUE_COLUMNS).apply(pd.to_numeric, errors='coerce')
+        ratings = np.trunc(values.iloc[:, :4]).astype('Int64').astype(object).where(values.iloc[:, :4].notna(), None)
+        durations = values.iloc[:, 4].astype(object).where(values.iloc[:, 4].notna(), None)
+        rows = [(i, cells[i], *rating_row, duration)
+                for i, (rating_row, duration) in enumerate(zip(ratings.to_numpy().tolist(), durations.tolist()))]
+        
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO files (path, columns, revision) VALUES (?, ?, 1) "
+                "ON CONFLICT (path) DO UPDATE SET columns = excluded.columns, revision = revision + 1",
+                (self.key(rated_path), json.dumps(list(df.columns))))
+            file_id = self.file_id(rated_path)
+            self.connection.execute("DELETE FROM observations WHERE file_id = ?", (file_id,))
+            self.connection.executemany(
+                "INSERT INTO observations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(file_id, *row) for row in rows])
+            
+    def file_id(self, rated_path):
+        found = self.connection.execute("SELECT id FROM files WHERE path = ?",
+                                        (self.key(rated_path),)).fetchone()
+        return found[0] if found else None
+    
+    def read_file(self, rated_path):
+        """Return a file's rows as a DataFrame with its original columns, or None if it isn't stored"""
+        found = self.connection.execute("SELECT id, columns FROM files WHERE path = ?",
+                                        (self.key(rated_path),)).fetchone()
+        if found is None:
+            return None
+        file_id, columns = found[0], json.loads(found[1])
+        
+        rows = self.connection.execute(
+            "SELECT cells, " + ", ".join(RATING_VALUE_COLUMNS) +
+            " FROM observations WHERE file_id = ? ORDER BY row", (file_id,)).fetchall()
+        other_columns = [col for col in columns if col not in RATING_VALUE_COLUMNS]
+        # One JSON document for all rows decodes much faster than a parse per row
+        cells = json.loads('[' + ','.join(row[0] for row in rows) + ']')
+        df = pd.DataFrame(cells, columns=other_columns)
+        values = pd.DataFrame([row[1:] for row in rows], columns=RATING_VALUE_COLUMNS, dtype=float)
+        for col in RATING_VALUE_COLUMNS:
+            if col in columns:
+                # Ratings come back as nullable integers, as the Helper writes them
+                df[col] = values[col] if col == 'Duration_Seconds' else values[col].astype('Int64')
+        return df[columns]
+    
+    def files(self):
+        """Return the stored files' rated copy paths, in the dataset index's path order"""
+        paths = [row[0] for row in self.connection.execute("SELECT path FROM files")]
+        paths.sort(key=lambda path: (os.path.dirname(path), os.path.basename(path)))
+        return [os.path.join(self.root, path) for path in paths]
+    
+    def revisions(self):
+        """Return {rated copy path: revision}, which changes whenever a file is written"""
+        return {os.path.join(self.root, path): revision
+                for path, revision in self.connection.execute("SELECT path, revision FROM files")}
+    
+    def export_csv(self, rated_path):
+        """Write a stored file out as its CSV rated copy"""
+        df = self.read_file(rated_path)
+        if df is None:
+            raise KeyError(f"{self.key(rated_path)} is not in the rating database")
+        write_csv_atomic(rated_path, df)
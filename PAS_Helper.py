@@ -1,15 +1,1022 @@
 import os
-import pandas as pd
+import argparse
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from tkinter import scrolledtext
-import glob
-from datetime import datetime
+import base64
+import bisect
+import json
+import queue
 import re
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from PAS_Common import (RATING_DATABASE_NAME, DatasetIndex, RatingDatabase, lazy_import, parse_time_to_seconds,
+                        parse_time_column, temp_path_for, write_csv_atomic, write_json_atomic)
 
-class PittsburghObservationTool:
+# pandas and numpy load on first use, so the window opens without waiting for them
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+RATING_COLUMNS = ['Aberrant_Vocalization', 'Motor_Agitation',
+                  'Aggressiveness', 'Resisting_Care']
+
+# Columns left out when a file has no Observation column and the whole row is shown
+NON_TEXT_COLUMNS = RATING_COLUMNS + ['Duration_Seconds', 'Time', 'Song', 'Score']
+
+# Columns tried in order for an observation's start time
+TIME_COLUMNS = ['Time', 'time', 'TIME', 'Timestamp', 'timestamp', 'Start_Time', 'start_time']
+
+# Where saved ratings go: CSV copies next to the observation files, the
+# dataset's rating database, or both
+RATING_STORES = ('csv', 'sqlite', 'both')
+
+# Memory budget for files kept open in the background
+DEFAULT_CACHE_MB = 256
+
+# Rated-row bitmaps of every file in a dataset, kept next to the file index
+PROGRESS_INDEX_NAME = '.pas_progress.json'
+PROGRESS_INDEX_VERSION = 1
+
+# Word index of the observation text of every file in a dataset, kept next to the file index
+SEARCH_INDEX_NAME = '.pas_search_index.json'
+SEARCH_INDEX_VERSION = 1
+OBSERVATION_COLUMNS = ['Observation', 'Observations']
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+# Words in the observation text that suggest a rating, per category: regular
+# expression (matched case-insensitively) -> rating. A row is suggested the
+# highest rating whose pattern it matches, 0 if none; --lexicon replaces these
+DEFAULT_LEXICON = {
+    'Aberrant_Vocalization': {
+        r'\b(moan|groan|mumbl|mutter|whimper)': 1,
+        r'\b(yell|shout|call(s|ed|ing)? out|crying out)': 2,
+        r'\b(scream|shriek|screech)': 3,
+    },
+    'Motor_Agitation': {
+        r'\b(pac(e|es|ed|ing)|wander|restless|fidget)': 1,
+        r'\b(trying to (leave|get (up|out|away))|exit.seeking)': 2,
+        r'\b(grab|cling|clutch)': 3,
+    },
+    'Aggressiveness': {
+        r'\b(threat|curs(e|es|ed|ing)|swear)': 1,
+        r'\b(shak(e|es|ing) (a |her |his )?fist|raised (a |her |his )?(fist|hand))': 2,
+        # Pushing a person, not a wheelchair, tray or button; a pronoun counts
+        # only on its own, as "pushes her wheelchair" is not aggression
+        r'\b(push(es|ed|ing)?|shov(e|es|ed|ing))\s+((the|a|another)\s+)?'
+        r'(staff|nurse|aide|caregiver|resident|someone|somebody|others?|peers?)\b': 3,
+        r'\b(push(es|ed|ing)?|shov(e|es|ed|ing))\s+(him|her|them|me)'
+        r'(?=\s*([.,;!]|$|\s(away|off|down|over|back|aside)\b))': 3,
+        r'\b(hit|kick|bit(e|es|ing)|bitten|scratch|punch|slap)': 4,
+    },
+    'Resisting_Care': {
+        r'\b(avoid|procrastinat|reluctan)': 1,
+        r'\b(refus|decline)': 2,
+        r'\bpush(es|ed|ing)? (away|off)': 3,
+    },
+}
+
+# Filling every duration of a file at once: the last row has no next
+# observation to measure to, and longer gaps than this are reported, not used
+DEFAULT_LAST_DURATION = 60
+DEFAULT_MAX_GAP_SECONDS = 3600
+
+# A journal this large is compacted by rewriting the rated file
+JOURNAL_COMPACT_BYTES = 1024 * 1024
+
+def processed_file_path(original_csv_path):
+    """Return the path a rated copy of an observation file is saved to"""
+    base_name = os.path.basename(original_csv_path)
+    dir_name = os.path.dirname(original_csv_path)
+    return os.path.join(dir_name, base_name.replace("Observations.csv", "Observations_with_Pittsburgh_Scale.csv"))
+
+def unrated_observation_files(index):
+    """Return the indexed observation files that are not rated copies themselves"""
+    return [f for f in index.files("Observations.csv")
+            if not f.endswith("Observations_with_Pittsburgh_Scale.csv")]
+
+def scan_dataset(index):
+    """Revalidate a dataset's file index against the disk, save it and return the observation files"""
+    if index.refresh():
+        index.save()
+    return unrated_observation_files(index)
+
+def file_stamp(csv_path):
+    """Return (size, mtime) of an observation file and its rated copy, to detect changes on disk"""
+    stamp = []
+    for path in (csv_path, processed_file_path(csv_path)):
+        try:
+            stat = os.stat(path)
+            stamp.append((stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            stamp.append(None)
+    return tuple(stamp)
+
+def time_gaps(df):
+    """Return the seconds from each observation's time to the next one's as written, NaN where unknown.
+    
+    Vectorized over the whole file: the first time column giving a nonzero
+    gap wins for each row, a gap is negative where the time goes back (as
+    it does across midnight), and the last row has no next observation.
+    """
+    gaps = np.full(len(df), np.nan)
+    for col in TIME_COLUMNS:
+        if col not in df.columns or len(df) < 2:
+            continue
+        seconds = parse_time_column(df[col])
+        col_gaps = seconds[1:] - seconds[:-1]
+        fill = np.isnan(gaps[:-1]) & ~np.isnan(col_gaps) & (col_gaps != 0)
+        gaps[:-1][fill] = col_gaps[fill]
+    return gaps
+
+def compute_durations_to_next(df):
+    """Return the seconds from each observation to the next one, NaN where unknown"""
+    gaps = time_gaps(df)
+    # Handle case where times cross midnight
+    return np.where(gaps < 0, gaps + 24 * 3600, gaps)
+
+def plan_duration_fill(gaps, current, last_duration=DEFAULT_LAST_DURATION,
+                       max_gap=DEFAULT_MAX_GAP_SECONDS, overwrite=False):
+    """Work out the durations of a whole file from its time gaps in one pass.
+    
+    Returns the rows to change, their new durations and the anomalies found
+    as (row, description) pairs. Gaps across midnight wrap around; a gap
+    still over max_gap after that, a time going back and a row without a
+    usable time are reported and left alone. The last row gets last_duration.
+    Rows whose current duration is set keep it unless overwrite is given.
+    """
+    durations = np.where(gaps < 0, gaps + 24 * 3600, gaps)
+    if len(durations):
+        durations[-1] = last_duration
+    
+    backwards = (gaps < 0) & (durations > max_gap)
+    too_long = (gaps > 0) & (durations > max_gap)
+    missing = np.isnan(durations)
+    anomalies = []
+    for row_index in np.flatnonzero(backwards | too_long | missing):
+        if backwards[row_index]:
+            description = f"time goes back {-gaps[row_index] / 60:.0f} min to the next row"
+        elif too_long[row_index]:
+            description = f"{gaps[row_index] / 60:.0f} min to the next row"
+        else:
+            description = "no usable time gap to the next row"
+        anomalies.append((int(row_index), description))
+    
+    fill = ~(backwards | too_long | missing)
+    if not overwrite:
+        fill &= np.isnan(current)
+    rows = np.flatnonzero(fill & (durations != current))
+    return rows, durations[rows], anomalies
+
+class OpenSlotFinder:
+    """Finds the next open position (an unrated row, an incomplete file) at or after an index.
+    
+    Positions only ever close, so each closed position points past itself and
+    lookups follow these pointers with path compression (the disjoint-set
+    "next free slot" structure): a lookup costs amortized near O(1) instead
+    of a scan over everything already done.
+    """
+    
+    def __init__(self, open_mask):
+        n = len(open_mask)
+        # Position n is a sentinel meaning "none left"
+        self.next = [i if is_open else i + 1 for i, is_open in enumerate(open_mask)] + [n]
+        
+    def close(self, index):
+        self.next[index] = index + 1
+        
+    def find(self, index):
+        """Return the first open position at or after index, or None"""
+        root = index
+        while self.next[root] != root:
+            root = self.next[root]
+        # Path compression: point everything visited straight at the result
+        while self.next[index] != root:
+            self.next[index], index = root, self.next[index]
+        return None if root == len(self.next) - 1 else root
+    
+    def find_wrapping(self, index):
+        """Return the first open position after index, continuing from the start, or None"""
+        found = self.find(index + 1) if index + 1 < len(self.next) else None
+        return found if found is not None else self.find(0)
+
+class RatingStore:
+    """Ratings of one file held in compact arrays instead of DataFrame cells.
+    
+    A uint8 matrix holds the four PAS ratings per row, a float32 vector the
+    durations (NaN where unset) and a bitmask which rows have been rated.
+    Auto-saving and displaying a row are array accesses whose cost doesn't
+    depend on how wide the CSV is; the DataFrame is only written at save time.
+    """
+    
+    def __init__(self, n_rows):
+        self.ratings = np.zeros((n_rows, len(RATING_COLUMNS)), dtype=np.uint8)
+        self.durations = np.full(n_rows, np.nan, dtype=np.float32)
+        self.rated = np.zeros(n_rows, dtype=bool)
+        self.unrated_rows = OpenSlotFinder(~self.rated)
+        
+    def __len__(self):
+        return len(self.rated)
+    
+    @property
+    def nbytes(self):
+        return self.ratings.nbytes + self.durations.nbytes + self.rated.nbytes
+    
+    @classmethod
+    def from_frame(cls, df):
+        """Build a store from a DataFrame's rating and duration columns"""
+        store = cls(len(df))
+        values = df.reindex(columns=RATING_COLUMNS).apply(pd.to_numeric, errors='coerce')
+        store.rated[:] = values.notna().any(axis=1).to_numpy()
+        store.ratings[:] = values.fillna(0).clip(0, 4).to_numpy(dtype=float)
+        if 'Duration_Seconds' in df.columns:
+            store.durations[:] = pd.to_numeric(df['Duration_Seconds'], errors='coerce').to_numpy(dtype=float)
+        store.unrated_rows = OpenSlotFinder(~store.rated)
+        return store
+    
+    def set_row(self, row_index, ratings, duration):
+        self.ratings[row_index] = ratings
+        self.durations[row_index] = duration
+        self.rated[row_index] = True
+        self.unrated_rows.close(row_index)
+        
+    def set_rows(self, rows, ratings, durations):
+        """Give rows (an index array) the same four ratings and each its own duration, in one update"""
+        self.ratings[rows] = ratings
+        self.durations[rows] = durations
+        self.rated[rows] = True
+        for row_index in rows:
+            self.unrated_rows.close(row_index)
+        
+    def set_durations(self, rows, durations):
+        """Set the durations of rows (an index array) without touching their ratings"""
+        self.durations[rows] = durations
+        
+    def next_unrated(self, row_index):
+        """Return the first unrated row after row_index, wrapping to the start, or None"""
+        return self.unrated_rows.find_wrapping(row_index)
+        
+    def row(self, row_index):
+        """Return (ratings, duration, rated) of a row; duration is None where unset"""
+        duration = float(self.durations[row_index])
+        # float32 keeps about 7 digits, which is plenty for seconds
+        duration = None if np.isnan(duration) else round(duration, 3)
+        return self.ratings[row_index].tolist(), duration, bool(self.rated[row_index])
+    
+    def to_frame(self, df):
+        """Return a copy of df with the stored ratings written to its rating columns"""
+        out = df.copy()
+        unrated = ~self.rated
+        for j, col in enumerate(RATING_COLUMNS):
+            out[col] = pd.arrays.IntegerArray(self.ratings[:, j].astype(np.int64), unrated)
+        out['Duration_Seconds'] = np.round(self.durations.astype(np.float64), 3)
+        return out
+
+def write_rated_file(csv_path, df):
+    """Write a rated DataFrame next to its observation file and return the path"""
+    new_path = processed_file_path(csv_path)
+    write_csv_atomic(new_path, df)
+    return new_path
+
+def read_observation_file(csv_path, database_root=None):
+    """Read an observation file and any previous ratings for it, without touching the UI.
+    
+    Safe to run on a background thread; the returned dict holds the DataFrame
+    with rating columns added, where previous ratings were found and their
+    DataFrame (or None), the files' stamp at read time and the DataFrame's
+    memory use, measured here rather than on the UI thread. With a database_root,
+    ratings in its rating database take precedence over the CSV rated copy.
+    """
+    stamp = file_stamp(csv_path)
+    df = pd.read_csv(csv_path)
+    
+    # Add new columns if they don't exist with proper dtypes
+    for col in RATING_COLUMNS:
+        if col not in df.columns:
+            # Use Int64 dtype for rating columns (allows NaN values)
+            df[col] = pd.Series(dtype='Int64')
+    
+    if 'Duration_Seconds' not in df.columns:
+        # Use float64 for duration
+        df['Duration_Seconds'] = pd.Series(dtype='float64')
+    
+    existing_path = processed_file_path(csv_path)
+    existing_df = None
+    if database_root is not None and os.path.exists(os.path.join(database_root, RATING_DATABASE_NAME)):
+        try:
+            with RatingDatabase(database_root) as database:
+                existing_df = database.read_file(existing_path)
+            if existing_df is not None:
+                existing_path = database.path
+        except Exception as e:
+            print(f"Could not read existing ratings from the rating database: {e}")
+    if existing_df is None:
+        if os.path.exists(existing_path):
+            try:
+                existing_df = pd.read_csv(existing_path)
+            except Exception as e:
+                print(f"Could not read existing ratings: {e}")
+        else:
+            existing_path = None
+    
+    return {'path': csv_path, 'df': df, 'existing_path': existing_path,
+            'existing_df': existing_df, 'durations_to_next': compute_durations_to_next(df),
+            'stamp': stamp, 'nbytes': int(df.memory_usage(deep=True).sum())}
+
+class RatingJournal:
+    """Append-only log of auto-saved rows for one observation file.
+    
+    Every auto-saved row is appended as one JSON line next to the rated copy,
+    so a crash loses nothing that was rated since the last save; a block of
+    rows rated at once is one line with all its rows. Entries hold absolute
+    values, so replaying the journal onto the rated copy is safe even if part
+    of it has already been saved.
+    """
+    
+    def __init__(self, csv_path):
+        self.path = processed_file_path(csv_path) + '.journal'
+        
+    def exists(self):
+        return os.path.exists(self.path)
+    
+    def size(self):
+        """Return the journal's length in bytes, 0 if there is none"""
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+        
+    def append(self, row_index, ratings, duration):
+        """Record a row's four ratings and duration"""
+        entry = {'row': int(row_index), 'ratings': [int(r) for r in ratings], 'duration': float(duration)}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            
+    def append_rows(self, rows, ratings, durations):
+        """Record a block of rows given the same four ratings, with their durations, as one entry"""
+        entry = {'rows': [int(r) for r in rows], 'ratings': [int(r) for r in ratings],
+                 'durations': [float(d) for d in durations]}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            
+    def append_durations(self, rows, durations):
+        """Record new durations of a block of rows, without ratings, as one entry"""
+        entry = {'rows': [int(r) for r in rows], 'durations': [float(d) for d in durations]}
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + '\n')
+            
+    def entries(self):
+        """Return the recorded entries in order, skipping a line cut short by a crash"""
+        entries = []
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except OSError:
+            pass
+        return entries
+    
+    def replay(self, store):
+        """Apply the recorded entries to a RatingStore and return how many rows were restored"""
+        restored = set()
+        for entry in self.entries():
+            if 'rows' in entry:
+                rows = np.asarray(entry['rows'], dtype=np.int64)
+                valid = (rows >= 0) & (rows < len(store))
+                durations = np.asarray(entry['durations'], dtype=float)
+                if 'ratings' in entry:
+                    store.set_rows(rows[valid], entry['ratings'], durations[valid])
+                else:
+                    store.set_durations(rows[valid], durations[valid])
+                restored.update(rows[valid].tolist())
+                continue
+            row_index = entry.get('row')
+            if not isinstance(row_index, int) or not 0 <= row_index < len(store):
+                continue
+            store.set_row(row_index, entry['ratings'], entry['duration'])
+            restored.add(row_index)
+        return len(restored)
+    
+    def compact(self, saved_size):
+        """Drop the first saved_size bytes, which are now part of the rated file; return the bytes dropped"""
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(saved_size)
+                remainder = f.read()
+                saved_size = min(saved_size, f.tell() - len(remainder))
+        except OSError:
+            return 0
+        
+        if remainder:
+            temp_path = temp_path_for(self.path)
+            with open(temp_path, 'wb') as f:
+                f.write(remainder)
+            os.replace(temp_path, self.path)
+        else:
+            os.remove(self.path)
+        return saved_size
+            
+    def discard(self):
+        """Delete the journal, giving up its unsaved edits"""
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+class ProgressIndex:
+    """Which rows of every file in a dataset are rated, as saved on disk.
+    
+    Kept as one bitmap per file in the dataset root, next to the file index.
+    It is updated whenever a file is saved, and files rated elsewhere are
+    picked up by a background scan of their rated copies.
+    """
+    
     def __init__(self, root):
         self.root = root
+        self.path = os.path.join(root, PROGRESS_INDEX_NAME)
+        self.entries = {}
+        
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == PROGRESS_INDEX_VERSION:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError):
+            pass  # Missing or unreadable index: progress is rebuilt by the scan
+        
+    def save(self):
+        try:
+            write_json_atomic(self.path, {'version': PROGRESS_INDEX_VERSION, 'files': self.entries})
+        except OSError as e:
+            print(f"Could not save progress index: {e}")
+            
+    def key(self, csv_path):
+        return os.path.relpath(csv_path, self.root)
+    
+    def update(self, csv_path, rated, stamp):
+        """Record a file's rated-row mask, with the stamp of the rated copy it describes"""
+        self.entries[self.key(csv_path)] = {
+            'rows': len(rated),
+            'rated_count': int(rated.sum()),
+            'bitmap': base64.b64encode(np.packbits(rated).tobytes()).decode('ascii'),
+            'stamp': stamp,
+        }
+        
+    def rated_mask(self, csv_path):
+        """Return a file's rated-row mask, or None if it isn't known"""
+        entry = self.entries.get(self.key(csv_path))
+        if entry is None:
+            return None
+        bits = np.frombuffer(base64.b64decode(entry['bitmap']), dtype=np.uint8)
+        return np.unpackbits(bits, count=entry['rows']).astype(bool)
+    
+    def completion(self, csv_path):
+        """Return (rated rows, rows) of a file, or None if it was never rated"""
+        entry = self.entries.get(self.key(csv_path))
+        if entry is None:
+            return None
+        return entry['rated_count'], entry['rows']
+    
+    def is_complete(self, csv_path):
+        done = self.completion(csv_path)
+        return done is not None and done[0] == done[1]
+    
+    def stamps(self):
+        """Return {key: stamp} of the known files, for a background scan to compare against"""
+        return {key: entry['stamp'] for key, entry in self.entries.items()}
+
+def rated_copy_stamp(csv_path):
+    """Return [size, mtime] of a file's rated copy, or None if there is none"""
+    stamp = file_stamp(csv_path)[1]
+    return list(stamp) if stamp else None
+
+def scan_progress(root, csv_files, known_stamps):
+    """Read the rated-row masks of files whose rated copies changed since they were indexed.
+    
+    Runs on a background thread; returns {csv_path: (rated mask, stamp)}.
+    """
+    found = {}
+    for csv_path in csv_files:
+        stamp = rated_copy_stamp(csv_path)
+        if stamp is None or known_stamps.get(os.path.relpath(csv_path, root)) == stamp:
+            continue
+        try:
+            rated_df = pd.read_csv(processed_file_path(csv_path),
+                                   usecols=lambda col: col in RATING_COLUMNS)
+        except Exception as e:
+            print(f"Could not read ratings of {csv_path}: {e}")
+            continue
+        found[csv_path] = (RatingStore.from_frame(rated_df).rated, stamp)
+    return found
+
+class SearchIndex:
+    """Inverted index from the words of the observation text to the rows they occur in.
+    
+    Each file's postings (word -> rows) are kept with the stamp of the
+    observation file they were built from, in the dataset root next to the
+    file index, and update() only re-reads files whose stamp changed. For
+    searching, prepare() merges them into one sorted vocabulary, so a query
+    word costs a binary search plus its hits instead of a pass over the text.
+    Query words match as prefixes ("refus" finds "refused") and all of them
+    must occur in a row.
+    """
+    
+    def __init__(self, root):
+        self.root = root
+        self.path = os.path.join(root, SEARCH_INDEX_NAME)
+        self.files = {}
+        self.csv_files = []
+        self.vocabulary = []
+        self.postings = {}
+        
+    def load(self):
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == SEARCH_INDEX_VERSION:
+                self.files = data.get('files', {})
+        except (OSError, ValueError):
+            pass  # Missing or unreadable index: every file is indexed again
+        
+    def save(self):
+        try:
+            write_json_atomic(self.path, {'version': SEARCH_INDEX_VERSION, 'files': self.files})
+        except OSError as e:
+            print(f"Could not save search index: {e}")
+            
+    def key(self, csv_path):
+        return os.path.relpath(csv_path, self.root)
+    
+    def update(self, csv_files):
+        """Index files that are new or changed and forget removed ones; return True if anything changed"""
+        keys = {self.key(path) for path in csv_files}
+        changed = keys != self.files.keys()
+        self.files = {key: entry for key, entry in self.files.items() if key in keys}
+        
+        for csv_path in csv_files:
+            stamp = list(file_stamp(csv_path)[0] or ())
+            entry = self.files.get(self.key(csv_path))
+            if entry is not None and entry['stamp'] == stamp:
+                continue
+            try:
+                words = self.index_file(csv_path)
+            except Exception as e:
+                print(f"Could not index {csv_path}: {e}")
+                continue
+            self.files[self.key(csv_path)] = {'stamp': stamp, 'words': words}
+            changed = True
+        return changed
+    
+    def index_file(self, csv_path):
+        """Return {word: [rows]} for a file's observation text"""
+        texts = pd.read_csv(csv_path, usecols=lambda col: col in OBSERVATION_COLUMNS)
+        words = {}
+        if texts.columns.empty:
+            return words
+        column = texts[[col for col in OBSERVATION_COLUMNS if col in texts.columns][0]]
+        for row_index, row_words in enumerate(column.fillna('').astype(str).str.lower().str.findall(WORD_PATTERN)):
+            for word in set(row_words):
+                words.setdefault(word, []).append(row_index)
+        return words
+    
+    def prepare(self, csv_files):
+        """Merge the files' postings for searching, numbering files in csv_files order"""
+        self.csv_files = list(csv_files)
+        self.postings = {}
+        for file_number, csv_path in enumerate(self.csv_files):
+            entry = self.files.get(self.key(csv_path))
+            if entry is None:
+                continue
+            for word, rows in entry['words'].items():
+                self.postings.setdefault(word, []).extend((file_number, row) for row in rows)
+        self.vocabulary = sorted(self.postings)
+        
+    def search(self, query):
+        """Return the (csv_path, row) hits of every word of query, in file and row order"""
+        hits = None
+        for term in WORD_PATTERN.findall(query.lower()):
+            matched = set()
+            start = bisect.bisect_left(self.vocabulary, term)
+            for word in self.vocabulary[start:]:
+                if not word.startswith(term):
+                    break
+                matched.update(self.postings[word])
+            hits = matched if hits is None else hits & matched
+        return [(self.csv_files[file_number], row) for file_number, row in sorted(hits or ())]
+
+def compile_lexicon(lexicon):
+    """Validate a {rating column: {pattern: rating}} lexicon and compile its patterns.
+    
+    Raises ValueError naming the first bad category, rating or pattern.
+    """
+    compiled = {}
+    for col, patterns in lexicon.items():
+        if col not in RATING_COLUMNS:
+            raise ValueError(f"unknown category {col!r} (expected one of {', '.join(RATING_COLUMNS)})")
+        compiled[col] = []
+        for pattern, rating in patterns.items():
+            if not isinstance(rating, int) or not 0 <= rating <= 4:
+                raise ValueError(f"rating for {pattern!r} in {col} must be 0-4, got {rating!r}")
+            try:
+                compiled[col].append((re.compile(pattern, re.IGNORECASE), rating))
+            except re.error as e:
+                raise ValueError(f"bad pattern {pattern!r} in {col}: {e}") from None
+    return compiled
+
+def load_lexicon(path):
+    """Read and compile a lexicon JSON file"""
+    with open(path, encoding='utf-8') as f:
+        return compile_lexicon(json.load(f))
+
+def observation_texts(df):
+    """Return each row's observation text: its Observation(s) column, or else all its text columns"""
+    for col in OBSERVATION_COLUMNS:
+        if col in df.columns:
+            return df[col].fillna('').astype(str)
+    text_columns = [col for col in df.columns if col not in NON_TEXT_COLUMNS]
+    texts = pd.Series('', index=df.index)
+    for col in text_columns:
+        texts = texts + df[col].fillna('').astype(str) + '\n'
+    return texts
+
+def suggest_ratings(df, lexicon):
+    """Return suggested ratings (rows x categories, uint8) from a compiled lexicon.
+    
+    Each pattern is matched against the whole text column at once. Safe to run
+    on a background thread.
+    """
+    texts = observation_texts(df)
+    suggestions = np.zeros((len(df), len(RATING_COLUMNS)), dtype=np.uint8)
+    for j, col in enumerate(RATING_COLUMNS):
+        for pattern, rating in lexicon.get(col, ()):
+            with warnings.catch_warnings():
+                # Groups in a lexicon pattern are fine; only whether it matches is used
+                warnings.simplefilter('ignore', UserWarning)
+                matched = texts.str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            suggestions[matched, j] = np.maximum(suggestions[matched, j], rating)
+    return suggestions
+
+def build_search_index(root, csv_files):
+    """Bring a dataset's search index up to date and prepare it for searching; runs on a background thread"""
+    index = SearchIndex(root)
+    index.load()
+    if index.update(csv_files):
+        index.save()
+    index.prepare(csv_files)
+    return index
+
+class FilePrefetcher:
+    """Reads the files next to the current one on a background thread.
+    
+    Switching files then swaps in an already parsed DataFrame instead of
+    blocking the UI on read_csv. A prefetched file that changed on disk since
+    it was read, or that the writer saved since, is discarded and read again;
+    the second check covers the rating database, which the files' stamp
+    doesn't see.
+    """
+    
+    def __init__(self, writer):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pas-prefetch')
+        self.writer = writer
+        self.pending = {}  # csv_path -> (future, writes of the file finished when it was submitted)
+        
+    def prefetch(self, csv_paths, database_root=None):
+        """Start reading csv_paths, dropping prefetched files no longer wanted"""
+        for path in list(self.pending):
+            if path not in csv_paths:
+                self.pending.pop(path)[0].cancel()
+        for path in csv_paths:
+            if path not in self.pending:
+                self.pending[path] = (self.executor.submit(read_observation_file, path, database_root),
+                                      self.writer.writes(path))
+                
+    def take(self, csv_path):
+        """Return the prefetched file, or None if it wasn't prefetched, failed or is stale"""
+        future, writes = self.pending.pop(csv_path, (None, None))
+        if future is None or future.cancelled():
+            return None
+        try:
+            prepared = future.result()
+        except Exception:
+            # Let the synchronous read report the error
+            return None
+        if prepared['stamp'] != file_stamp(csv_path) or writes != self.writer.writes(csv_path):
+            return None
+        return prepared
+    
+    def clear(self):
+        """Forget all prefetched files"""
+        self.prefetch([])
+        
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+class FileCache:
+    """LRU cache of files opened in this session, with their row cursor and unsaved edits.
+    
+    Going back to a cached file restores it as it was left, without reading it
+    again or asking about existing ratings. When the cache is over its memory
+    budget the least recently used files are evicted, clean ones first. A file
+    evicted with unsaved edits is handed back to be written, as its journal
+    would be compacted, so saving or discarding on close never misses it.
+    """
+    
+    def __init__(self, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        
+    def __contains__(self, csv_path):
+        return csv_path in self.entries
+    
+    def put(self, csv_path, entry):
+        """Keep a file that is being left, as the most recently used entry.
+        
+        entry holds the file's 'df' with its measured 'df_nbytes', 'store',
+        'durations_to_next', 'row' and 'unsaved' flag. Returns the (csv_path, entry) pairs evicted with
+        unsaved edits, which the caller must write.
+        """
+        self.entries.pop(csv_path, None)
+        entry['nbytes'] = entry['df_nbytes'] + entry['store'].nbytes
+        self.entries[csv_path] = entry
+        return self.evict()
+        
+    def take(self, csv_path):
+        """Remove and return a cached file's entry, or None"""
+        return self.entries.pop(csv_path, None)
+    
+    def evict(self):
+        """Drop least recently used entries, clean before unsaved, until the cache fits its budget.
+        
+        Returns the (csv_path, entry) pairs dropped with unsaved edits.
+        """
+        total = sum(entry['nbytes'] for entry in self.entries.values())
+        unsaved = []
+        for path in sorted(self.entries, key=lambda p: self.entries[p]['unsaved']):
+            if total <= self.max_bytes:
+                break
+            entry = self.entries.pop(path)
+            total -= entry['nbytes']
+            if entry['unsaved']:
+                unsaved.append((path, entry))
+        return unsaved
+            
+    def unsaved_paths(self):
+        return [path for path, entry in self.entries.items() if entry['unsaved']]
+    
+    def mark_saved(self, csv_path):
+        self.entries[csv_path]['unsaved'] = False
+
+class BackgroundWriter:
+    """Writes rated files on a background thread so saving never blocks the UI.
+    
+    Files are written one at a time, atomically: as CSV rated copies and/or,
+    in one transaction each, to the dataset's rating database (see
+    RATING_STORES). A save requested for a file that is still waiting to be
+    written replaces the waiting data, so a burst of Ctrl+S writes the file
+    once with the latest ratings. Finished writes are reported as
+    (csv_path, error, token) tuples on the results queue, for the UI thread
+    to pick up.
+    """
+    
+    def __init__(self, store='csv'):
+        self.store = store
+        self.databases = {}  # Open only on the writer thread, by dataset root
+        self.pending = OrderedDict()
+        self.writing = None
+        self.finished = {}  # csv_path -> writes finished this session
+        self.closed = False
+        self.condition = threading.Condition()
+        self.results = queue.Queue()
+        self.thread = threading.Thread(target=self.run, name='pas-writer', daemon=True)
+        self.thread.start()
+        
+    def save(self, csv_path, df, token=None, database_root=None):
+        """Queue df to be written as the rated copy of csv_path; df must not be modified afterwards.
+        
+        token is handed back with the result, to tell which request was written.
+        database_root is the dataset whose rating database receives the file.
+        """
+        with self.condition:
+            self.pending[csv_path] = (df, token, database_root)
+            self.condition.notify()
+            
+    def writes(self, csv_path):
+        """Return how many writes of csv_path have finished, to tell whether a read predates one"""
+        with self.condition:
+            return self.finished.get(csv_path, 0)
+        
+    def busy(self):
+        """Return True while any file is queued or being written"""
+        with self.condition:
+            return bool(self.pending) or self.writing is not None
+        
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    for database in self.databases.values():
+                        database.close()
+                    return
+                csv_path, (df, token, database_root) = self.pending.popitem(last=False)
+                self.writing = csv_path
+            
+            try:
+                if self.store in ('csv', 'both'):
+                    write_rated_file(csv_path, df)
+                if self.store in ('sqlite', 'both') and database_root is not None:
+                    self.database(database_root).write_file(processed_file_path(csv_path), df)
+                error = None
+            except Exception as e:
+                error = e
+            
+            # Report before clearing writing, so busy() never reads False while a result is unreported
+            with self.condition:
+                self.results.put((csv_path, error, token))
+                self.finished[csv_path] = self.finished.get(csv_path, 0) + 1
+                self.writing = None
+            
+    def database(self, root):
+        if root not in self.databases:
+            self.databases[root] = RatingDatabase(root)
+        return self.databases[root]
+    
+    def close(self):
+        """Finish all queued writes and stop the thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+class RowTable:
+    """Scrollable table of every row of the open file, drawn on a single Canvas.
+    
+    Only the rows in view are drawn: a fixed pool of canvas items, one line
+    per visible row, is refilled from the DataFrame and the rating store on
+    every scroll. Opening and scrolling cost the same for a file of ten rows
+    as for one of ten thousand, and no widget is created per row. Clicking a
+    row moves the rating cursor there.
+    """
+    
+    ROW_HEIGHT = 20
+    CHAR_WIDTH = 7  # Approximate pixels per character, to cut text to its column
+    COLUMNS = [('Row', 50), ('Time', 80), ('Song', 170), ('Observation', 340),
+               ('AV', 34), ('MA', 34), ('AG', 34), ('RC', 34)]
+    
+    def __init__(self, app):
+        self.app = app
+        self.top = 0
+        self.lines = []  # (background, [text per column]) canvas items of each visible line
+        
+        self.window = tk.Toplevel(app.root)
+        self.window.title("All Rows")
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(0, weight=1)
+        
+        width = sum(col_width for _, col_width in self.COLUMNS)
+        self.canvas = tk.Canvas(self.window, width=width, height=self.ROW_HEIGHT * 26,
+                                background='white', highlightthickness=0)
+        self.canvas.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.on_scroll)
+        self.scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        
+        # Column headers stay on the canvas's first line
+        self.canvas.create_rectangle(0, 0, width, self.ROW_HEIGHT, fill='#e8e8e8', outline='')
+        x = 0
+        for title, col_width in self.COLUMNS:
+            self.canvas.create_text(x + 4, self.ROW_HEIGHT // 2, text=title, anchor='w',
+                                    font=('Arial', 9, 'bold'))
+            x += col_width
+        
+        self.canvas.bind('<Configure>', lambda e: self.build_lines())
+        self.canvas.bind('<Button-1>', self.on_click)
+        # Wheel deltas are multiples of 120 on Windows but +-1 on macOS, so only the sign
+        # counts; X11 reports the wheel as buttons 4 and 5
+        self.canvas.bind('<MouseWheel>', lambda e: self.scroll_to(self.top + (-3 if e.delta > 0 else 3)))
+        self.canvas.bind('<Button-4>', lambda e: self.scroll_to(self.top - 3))
+        self.canvas.bind('<Button-5>', lambda e: self.scroll_to(self.top + 3))
+        
+    def exists(self):
+        return bool(self.window.winfo_exists())
+    
+    def lift(self):
+        self.window.lift()
+        
+    def row_count(self):
+        store = self.app.rating_store
+        return len(store) if store is not None else 0
+    
+    def visible_rows(self):
+        return max(1, self.canvas.winfo_height() // self.ROW_HEIGHT - 1)
+    
+    def build_lines(self):
+        """Create one line of canvas items per visible row, e.g. after a resize"""
+        count = self.visible_rows()
+        if count != len(self.lines):
+            self.canvas.delete('line')
+            self.lines = []
+            width = sum(col_width for _, col_width in self.COLUMNS)
+            for line in range(count):
+                y = (line + 1) * self.ROW_HEIGHT
+                background = self.canvas.create_rectangle(0, y, width, y + self.ROW_HEIGHT,
+                                                          outline='', tags='line')
+                texts, x = [], 0
+                for _, col_width in self.COLUMNS:
+                    texts.append(self.canvas.create_text(x + 4, y + self.ROW_HEIGHT // 2, anchor='w',
+                                                         font=('Arial', 9), tags='line'))
+                    x += col_width
+                self.lines.append((background, texts))
+        self.redraw()
+        
+    def scroll_to(self, top):
+        self.top = max(0, min(top, self.row_count() - len(self.lines)))
+        self.redraw()
+        
+    def on_scroll(self, action, amount, unit=None):
+        """Scrollbar command: 'moveto fraction' or 'scroll n units|pages'"""
+        if action == 'moveto':
+            self.scroll_to(int(float(amount) * self.row_count()))
+        elif action == 'scroll':
+            step = len(self.lines) if unit == 'pages' else 1
+            self.scroll_to(self.top + int(amount) * step)
+            
+    def show_row(self, row_index):
+        """Redraw, scrolling just enough to bring row_index into view"""
+        self.window.title(f"All Rows - {os.path.basename(self.app.current_csv_path)}")
+        if not self.lines:
+            self.top = row_index  # Not laid out yet; build_lines draws from here
+        elif row_index < self.top:
+            self.top = row_index
+        elif row_index >= self.top + len(self.lines):
+            self.top = row_index - len(self.lines) + 1
+        self.scroll_to(self.top)
+        
+    def on_click(self, event):
+        row_index = self.top + event.y // self.ROW_HEIGHT - 1
+        if event.y >= self.ROW_HEIGHT and row_index < self.row_count():
+            self.app.move_to_row(row_index)
+            
+    def row_cells(self, row_index):
+        """Return the texts of a row's columns"""
+        df = self.app.current_df
+        store = self.app.rating_store
+        time_text = df['Time'].iat[row_index] if 'Time' in df.columns else ''
+        song = df['Song'].iat[row_index] if 'Song' in df.columns else ''
+        observation_columns = [col for col in ('Observation', 'Observations') if col in df.columns]
+        if observation_columns:
+            observation = df[observation_columns[0]].iat[row_index]
+            observation = '' if pd.isna(observation) else str(observation)
+        else:
+            observation = self.app.row_display(row_index)[1]
+        
+        cells = [str(row_index + 1), '' if pd.isna(time_text) else str(time_text),
+                 '' if pd.isna(song) else str(song), ' '.join(observation.split())]
+        suggested = None if store.rated[row_index] else self.app.suggested_ratings(row_index)
+        if store.rated[row_index]:
+            cells.extend(str(rating) for rating in store.ratings[row_index])
+        elif suggested is not None and any(suggested):
+            # Suggestions are shown, marked, until the row is confirmed
+            cells.extend(f"{rating}?" if rating else '·' for rating in suggested)
+        else:
+            cells.extend('·' * len(RATING_COLUMNS))
+        return cells
+    
+    def redraw(self):
+        """Fill the visible lines from the rows starting at self.top"""
+        n_rows = self.row_count()
+        current = self.app.current_row_index
+        for line, (background, texts) in enumerate(self.lines):
+            row_index = self.top + line
+            if row_index >= n_rows:
+                self.canvas.itemconfigure(background, fill='')
+                for text in texts:
+                    self.canvas.itemconfigure(text, text='')
+                continue
+            
+            fill = '#cde4ff' if row_index == current else ('#f6f6f6' if row_index % 2 else '')
+            self.canvas.itemconfigure(background, fill=fill)
+            for text, cell, (_, col_width) in zip(texts, self.row_cells(row_index), self.COLUMNS):
+                max_chars = col_width // self.CHAR_WIDTH
+                if len(cell) > max_chars:
+                    cell = cell[:max_chars - 1] + '…'
+                self.canvas.itemconfigure(text, text=cell)
+        
+        if n_rows:
+            self.scrollbar.set(self.top / n_rows, min(1.0, (self.top + len(self.lines)) / n_rows))
+        else:
+            self.scrollbar.set(0, 1)
+
+class PittsburghObservationTool:
+    def __init__(self, root, cache_mb=DEFAULT_CACHE_MB, store='csv', lexicon=None,
+                 last_duration=DEFAULT_LAST_DURATION, max_gap=DEFAULT_MAX_GAP_SECONDS):
+        self.root = root
         self.root.title("Pittsburgh Agitation Scale Observation Tool")
         
         # Remove fixed geometry - let it auto-size
@@ -19,12 +1026,44 @@ class PittsburghObservationTool:
         # Variables
         self.current_csv_path = None
         self.current_df = None
+        self.current_df_nbytes = 0  # Memory use of current_df, measured when it was read
         self.csv_files = []
         self.current_file_index = 0
         self.current_row_index = 0
         self.unsaved_changes = False
         self.existing_processed_file = None
         self.calculated_duration = None
+        self.durations_to_next = None
+        self.last_duration = last_duration
+        self.max_gap = max_gap
+        self.rating_store = None
+        self.render_after_id = None  # Pending coalesced row render
+        self.widget_state = {}  # Last options set on each label and text widget
+        self.scanner = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pas-scan')
+        # Rating suggestions are computed off the UI thread and kept per file
+        self.lexicon = lexicon if lexicon is not None else compile_lexicon(DEFAULT_LEXICON)
+        self.suggester = ThreadPoolExecutor(max_workers=1, thread_name_prefix='pas-suggest')
+        self.suggestions = {}
+        self.pending_suggestions = set()
+        self.shown_suggestion = None  # Suggestion pre-filled in the rating controls, until accepted or edited
+        self.dataset_folder = None
+        self.dataset_roots = {}  # csv_path -> dataset folder it was opened from, for the rating database
+        self.progress = None
+        self.incomplete_files = None  # OpenSlotFinder over csv_files, rebuilt when progress changes
+        self.file_list_window = None
+        self.file_list_lines = []  # Text of each line shown in the file list
+        self.row_table = None
+        self.range_mark = None  # (csv_path, row) of one end of a block to rate
+        self.search_index = None
+        self.search_window = None
+        self.search_hits = []
+        self.search_position = -1
+        self.file_cache = FileCache(cache_mb * 1024 * 1024)
+        self.store = store
+        self.writer = BackgroundWriter(store)
+        self.prefetcher = FilePrefetcher(self.writer)
+        self.polling_saves = False
+        self.journal_trimmed = {}  # Bytes compacted out of each journal this session
         
         # Pittsburgh Agitation Scale parameters
         self.pas_categories = {
@@ -48,42 +1087,7 @@ class PittsburghObservationTool:
         
     def parse_time_string(self, time_str):
         """Parse various time formats and return total seconds from start of day"""
-        if pd.isna(time_str) or time_str == '':
-            return None
-            
-        time_str = str(time_str).strip()
-        
-        # Try different time formats
-        formats = [
-            '%H:%M:%S',      # 14:30:45
-            '%H:%M',         # 14:30
-            '%I:%M %p',      # 2:30 PM
-            '%I:%M:%S %p',   # 2:30:45 PM
-            '%H.%M.%S',      # 14.30.45
-            '%H.%M',         # 14.30
-        ]
-        
-        for fmt in formats:
-            try:
-                time_obj = datetime.strptime(time_str, fmt)
-                # Calculate seconds from midnight
-                return time_obj.hour * 360 + time_obj.minute * 60 + time_obj.second
-            except ValueError:
-                continue
-        
-        # Try to extract numbers for minutes:seconds format (e.g., "5:30" meaning 5 min 30 sec)
-        match = re.match(r'(\d+):(\d+)', time_str)
-        if match:
-            minutes = int(match.group(1))
-            seconds = int(match.group(2))
-            if minutes < 60:  # Likely minutes:seconds rather than hours:minutes
-                return minutes * 60 + seconds
-        
-        # Try to parse as just seconds
-        try:
-            return float(time_str)
-        except ValueError:
-            return None
+        return parse_time_to_seconds(time_str)
     
     def calculate_time_difference(self, time1, time2):
         """Calculate the difference in seconds between two time strings"""
@@ -94,43 +1098,74 @@ class PittsburghObservationTool:
             diff = seconds2 - seconds1
             # Handle case where times cross midnight
             if diff < 0:
-                diff += 24 * 360  # Add 24 hours
+                diff += 24 * 3600  # Add 24 hours
             return diff
         return None
         
     def calculate_duration_to_next(self):
-        """Calculate duration in seconds from current observation to next"""
-        if self.current_df is None or len(self.current_df) == 0:
+        """Look up the duration in seconds from current observation to next, computed at load"""
+        if self.durations_to_next is None or self.current_row_index >= len(self.durations_to_next):
             return None
-            
-        if self.current_row_index >= len(self.current_df) - 1:
-            return None  # No next row
-            
-        current_row = self.current_df.iloc[self.current_row_index]
-        next_row = self.current_df.iloc[self.current_row_index + 1]
-        
-        # Try to get time from Time column
-        if 'Time' in self.current_df.columns:
-            duration = self.calculate_time_difference(current_row['Time'], next_row['Time'])
-            if duration is not None and duration > 0:
-                return duration
-        
-        # Try other common time column names
-        for col in ['time', 'TIME', 'Timestamp', 'timestamp', 'Start_Time', 'start_time']:
-            if col in self.current_df.columns:
-                duration = self.calculate_time_difference(current_row[col], next_row[col])
-                if duration is not None and duration > 0:
-                    return duration
         
-        return None
+        duration = self.durations_to_next[self.current_row_index]
+        if np.isnan(duration):
+            return None  # No next row or no usable times
+        return float(duration)
         
     def apply_calculated_duration(self):
         """Apply the calculated duration to the duration field"""
+        self.flush_render()
         if self.calculated_duration is not None:
             self.duration_var.set(str(int(self.calculated_duration)))
             self.mark_unsaved()
             self.update_status(f"Applied calculated duration: {int(self.calculated_duration)} seconds")
         
+    def fill_durations(self):
+        """Set the duration of every row of the file from its timestamps in one pass and report odd gaps"""
+        if self.rating_store is None:
+            return "break"
+        self.flush_render()
+        
+        gaps = time_gaps(self.current_df)
+        current = self.rating_store.durations.astype(np.float64)
+        rows, durations, anomalies = plan_duration_fill(gaps, current, self.last_duration, self.max_gap)
+        
+        # Durations already set (by hand or an earlier fill) are kept unless the user says otherwise
+        all_rows, all_durations, _ = plan_duration_fill(gaps, current, self.last_duration, self.max_gap,
+                                                        overwrite=True)
+        differing = len(all_rows) - len(rows)
+        if differing:
+            overwrite = messagebox.askyesnocancel(
+                "Fill Durations",
+                f"{differing} rows already have a duration that differs from their timestamps.\n\n"
+                "Overwrite them too?")
+            if overwrite is None:
+                return "break"
+            if overwrite:
+                rows, durations = all_rows, all_durations
+        
+        if len(rows):
+            self.rating_store.set_durations(rows, durations)
+            journal = RatingJournal(self.current_csv_path)
+            journal.append_durations(rows, durations)
+            self.row_saved(journal)
+            if self.current_row_index in rows:
+                duration = float(self.rating_store.durations[self.current_row_index])
+                self.set_var(self.duration_var, str(int(duration) if duration % 1 == 0 else round(duration, 3)))
+            if self.row_table is not None and self.row_table.exists():
+                self.row_table.redraw()
+        
+        message = f"Filled {len(rows)} durations from the timestamps"
+        if anomalies:
+            message += f" | {len(anomalies)} gaps left alone"
+            shown = [f"Row {row_index + 1}: {description}" for row_index, description in anomalies[:20]]
+            if len(anomalies) > len(shown):
+                shown.append(f"... and {len(anomalies) - len(shown)} more")
+            messagebox.showwarning("Duration Anomalies",
+                                   "These rows' durations were not filled:\n\n" + "\n".join(shown))
+        self.update_status(message)
+        return "break"
+        
     def center_window(self):
         """Center the window on the screen after auto-sizing"""
         self.root.update_idletasks()  # Make sure window is rendered
@@ -318,7 +1353,7 @@ class PittsburghObservationTool:
             self.rating_combos[category] = combo
             
             # Bind change event to mark unsaved changes
-            combo.bind('<<ComboboxSelected>>', lambda e: self.mark_unsaved())
+            combo.bind('<<ComboboxSelected>>', lambda e: self.ratings_edited())
             
             # Override arrow key behavior in comboboxes
             combo.bind('<Up>', lambda e: (self.previous_row(), "break")[1])
@@ -345,6 +1380,10 @@ class PittsburghObservationTool:
         ttk.Label(duration_frame, text="(60s = 1 min, 300s = 5 min, 60s = 10 min)", 
                  font=('Arial', 9), foreground='gray').grid(row=0, column=2, padx=5)
         
+        # Marks ratings pre-filled from the observation text until the row is saved
+        self.suggestion_label = ttk.Label(rating_frame, text="", font=('Arial', 9), foreground='#b36b00')
+        self.suggestion_label.grid(row=len(self.pas_categories) + 1, column=0, columnspan=2)
+        
         # Right side - Helper panel with time calculator and shortcuts info
         helper_frame = ttk.LabelFrame(rating_container, text="Helper Tools", padding="10")
         helper_frame.grid(row=0, column=1, sticky=(tk.W, tk.E, tk.N), padx=(5, 0))
@@ -361,6 +1400,9 @@ class PittsburghObservationTool:
                                             command=self.apply_calculated_duration, width=15)
         self.apply_duration_btn.grid(row=1, column=0, pady=5)
         
+        ttk.Button(calc_frame, text="Fill All (Ctrl+Shift+D)",
+                   command=self.fill_durations, width=15).grid(row=2, column=0, pady=5)
+        
         # Keyboard Shortcuts info
         shortcuts_frame = ttk.LabelFrame(helper_frame, text="Keyboard Shortcuts", padding="5")
         shortcuts_frame.grid(row=1, column=0, sticky=(tk.W, tk.E), pady=10)
@@ -369,6 +1411,17 @@ class PittsburghObservationTool:
 Ctrl+1-4: Set all to level
 Ctrl+S: Save file
 Ctrl+D: Apply duration
+Ctrl+Shift+D: Fill all durations
+Ctrl+N: Next unrated row
+Ctrl+Shift+N: Next incomplete file
+Ctrl+L: File list
+Ctrl+E: Export CSV
+Ctrl+T: Table of all rows
+Ctrl+F: Search observations
+Ctrl+Enter: Accept suggestion
+Ctrl+M / Ctrl+B: Mark / rate range
+Ctrl+U: Rate until song change
+F3/Shift+F3: Next/previous hit
 ↑↓: Navigate rows
 Alt+←→: Navigate files"""
         
@@ -387,20 +1440,40 @@ Alt+←→: Navigate files"""
                                         command=self.save_file, style='Accent.TButton')
         self.save_file_btn.grid(row=0, column=1, padx=20)
         
-        # Status bar
-        self.status_label = ttk.Label(main_frame, text="Ready | Use Arrow Keys to Navigate", relief=tk.SUNKEN)
-        self.status_label.grid(row=5, column=0, sticky=(tk.W, tk.E), pady=5)
+        # Status bar, with the background save state on the right
+        status_frame = ttk.Frame(main_frame)
+        status_frame.grid(row=5, column=0, sticky=(tk.W, tk.E), pady=5)
+        status_frame.columnconfigure(0, weight=1)
+        
+        self.status_label = ttk.Label(status_frame, text="Ready | Use Arrow Keys to Navigate", relief=tk.SUNKEN)
+        self.status_label.grid(row=0, column=0, sticky=(tk.W, tk.E))
+        
+        self.save_state_label = ttk.Label(status_frame, text="", relief=tk.SUNKEN, width=20)
+        self.save_state_label.grid(row=0, column=1, sticky=tk.E)
         
     def setup_global_keybindings(self):
         """Setup global keyboard shortcuts that work regardless of focus"""
         # Use bind_all for global bindings that work everywhere
-        self.root.bind_all('<Up>', lambda e: self.previous_row())
-        self.root.bind_all('<Down>', lambda e: self.next_row())
+        self.root.bind_all('<Up>', lambda e: self.previous_row() if self.moves_rows(e) else None)
+        self.root.bind_all('<Down>', lambda e: self.next_row() if self.moves_rows(e) else None)
         self.root.bind_all('<Alt-Left>', lambda e: self.previous_csv())
         self.root.bind_all('<Alt-Right>', lambda e: self.next_csv())
         self.root.bind_all('<Control-s>', lambda e: self.save_file())
         self.root.bind_all('<Control-0>', lambda e: self.set_all_zero())
         self.root.bind_all('<Control-d>', lambda e: self.apply_calculated_duration())  # Quick apply duration
+        self.root.bind_all('<Control-D>', lambda e: self.fill_durations())
+        self.root.bind_all('<Control-n>', lambda e: self.jump_to_next_unrated_row())
+        self.root.bind_all('<Control-N>', lambda e: self.jump_to_next_incomplete_file())
+        self.root.bind_all('<Control-l>', lambda e: self.show_file_list())
+        self.root.bind_all('<Control-e>', lambda e: self.export_csv())
+        self.root.bind_all('<Control-t>', lambda e: self.show_row_table())
+        self.root.bind_all('<Control-f>', lambda e: self.show_search())
+        self.root.bind_all('<Control-Return>', lambda e: self.accept_suggestion())
+        self.root.bind_all('<Control-m>', lambda e: self.toggle_range_mark())
+        self.root.bind_all('<Control-b>', lambda e: self.rate_marked_range())
+        self.root.bind_all('<Control-u>', lambda e: self.rate_until_song_change())
+        self.root.bind_all('<F3>', lambda e: self.walk_search_hits(1))
+        self.root.bind_all('<Shift-F3>', lambda e: self.walk_search_hits(-1))
         
         # Alternative number keys for ratings (Ctrl+1-4 for quick rating)
         self.root.bind_all('<Control-Key-1>', lambda e: self.quick_set_rating(1))
@@ -408,31 +1481,40 @@ Alt+←→: Navigate files"""
         self.root.bind_all('<Control-Key-3>', lambda e: self.quick_set_rating(3))
         self.root.bind_all('<Control-Key-4>', lambda e: self.quick_set_rating(4))
         
+    def moves_rows(self, event):
+        """Return whether an arrow key event should move the rating cursor.
+        
+        The file list and search windows use the arrow keys for their own
+        lists and entry; their class bindings have already run by the time
+        the application-wide binding sees the event.
+        """
+        widget = event.widget
+        if not hasattr(widget, 'winfo_toplevel'):
+            return True  # Tk internals such as a combobox popdown report a path name
+        return widget.winfo_toplevel() not in (self.file_list_window, self.search_window)
+        
     def quick_set_rating(self, rating_level):
         """Quick set all ratings to the same level using Ctrl+number keys"""
+        self.flush_render()
         # Note: rating_level 1-4 maps to options 1-4 (not 0-4)
         for category in self.pas_categories:
             self.rating_vars[category].set(self.pas_categories[category][rating_level])
-        self.mark_unsaved()
+        self.ratings_edited()
         self.update_status(f"All ratings set to level {rating_level}")
         
     def check_for_existing_processed_file(self, original_csv_path):
         """Check if a processed version of this file already exists"""
-        base_name = os.path.basename(original_csv_path)
-        dir_name = os.path.dirname(original_csv_path)
-        
-        # Generate the expected processed filename
-        processed_name = base_name.replace("Observations.csv", "Observations_with_Pittsburgh_Scale.csv")
-        processed_path = os.path.join(dir_name, processed_name)
+        processed_path = processed_file_path(original_csv_path)
         
         if os.path.exists(processed_path):
             return processed_path
         return None
         
-    def load_existing_ratings(self, processed_path):
-        """Load existing ratings from a previously processed file"""
+    def load_existing_ratings(self, processed_path, existing_df=None):
+        """Load existing ratings from a previously processed file (or its already read DataFrame)"""
         try:
-            existing_df = pd.read_csv(processed_path)
+            if existing_df is None:
+                existing_df = pd.read_csv(processed_path)
             
             # Check if the processed file has the Pittsburgh columns
             required_cols = ['Aberrant_Vocalization', 'Motor_Agitation', 
@@ -440,15 +1522,16 @@ Alt+←→: Navigate files"""
             
             if all(col in existing_df.columns for col in required_cols):
                 # Copy the ratings to the current dataframe, ensuring proper dtype
+                # Blanks stay blank, so rows nobody rated still count as unrated
                 for col in required_cols:
                     if col in existing_df.columns:
                         # Convert to appropriate dtype to avoid FutureWarning
                         if col == 'Duration_Seconds':
                             # Duration should be numeric
-                            self.current_df[col] = pd.to_numeric(existing_df[col], errors='coerce').fillna(60)
+                            self.current_df[col] = pd.to_numeric(existing_df[col], errors='coerce')
                         else:
                             # Rating columns should be stored as integers
-                            self.current_df[col] = pd.to_numeric(existing_df[col], errors='coerce').fillna(0).astype('Int64')
+                            self.current_df[col] = pd.to_numeric(existing_df[col], errors='coerce').round().astype('Int64')
                 
                 self.existing_data_label.config(
                     text=f"✓ Loaded existing ratings from previous session", 
@@ -460,23 +1543,39 @@ Alt+←→: Navigate files"""
         
         return False
         
+    def ratings_edited(self):
+        """Note an explicit edit of the rating controls, which confirms the values they show"""
+        self.shown_suggestion = None
+        self.mark_unsaved()
+        
     def mark_unsaved(self):
         """Mark that there are unsaved changes"""
         self.unsaved_changes = True
-        self.unsaved_indicator.config(text="⚠ Unsaved changes")
-        self.save_file_btn.config(text="💾 Save File to Disk* [Ctrl+S]")
+        self.update_widget(self.unsaved_indicator, text="⚠ Unsaved changes")
+        self.update_widget(self.save_file_btn, text="💾 Save File to Disk* [Ctrl+S]")
         
     def clear_unsaved(self):
         """Clear the unsaved changes indicator"""
         self.unsaved_changes = False
-        self.unsaved_indicator.config(text="")
-        self.save_file_btn.config(text="💾 Save File to Disk [Ctrl+S]")
+        self.update_widget(self.unsaved_indicator, text="")
+        self.update_widget(self.save_file_btn, text="💾 Save File to Disk [Ctrl+S]")
         
     def auto_save_current_row(self):
         """Automatically save the current row's ratings to the dataframe"""
-        if self.current_df is None:
+        if self.current_df is None or len(self.current_df) == 0:
             return
-            
+        
+        # The rating controls must show this row before they are read
+        self.flush_render()
+        ratings, duration = self.read_rating_controls()
+        self.save_row(self.current_row_index, ratings, duration)
+        
+    def read_rating_controls(self):
+        """Return the four ratings and the duration set in the rating controls.
+        
+        A suggestion still shown as pre-filled is not confirmed, so it reads as
+        the usual zeros.
+        """
         # Check if any rating is set (not default)
         any_rating_set = False
         for category, var in self.rating_vars.items():
@@ -489,95 +1588,315 @@ Alt+←→: Navigate files"""
             for category in self.pas_categories:
                 self.rating_vars[category].set(self.pas_categories[category][0])
         
-        # Save ratings to dataframe with proper dtype handling
+        # Save ratings to the rating store
+        ratings = []
         for category, var in self.rating_vars.items():
-            col_name = category.replace(' ', '_')
             # Extract just the number from the rating (e.g., "0 - Not present" -> "0")
             rating_value = var.get().split(' - ')[0]
-            
-            # Ensure proper dtype for the column
-            if col_name not in self.current_df.columns:
-                self.current_df[col_name] = pd.Series(dtype='Int64')
-            
-            # Convert rating_value to integer
             try:
-                rating_int = int(rating_value)
-                self.current_df.at[self.current_row_index, col_name] = rating_int
+                ratings.append(int(rating_value))
             except (ValueError, TypeError):
-                self.current_df.at[self.current_row_index, col_name] = 0
+                ratings.append(0)
+        if self.shown_suggestion is not None:
+            ratings = [0] * len(RATING_COLUMNS)
         
-        # Save duration in seconds with proper dtype
+        # Save duration in seconds
         try:
             duration = float(self.duration_var.get())
             if duration <= 0:
                 duration = 60  # Default to 60 seconds if invalid
         except ValueError:
             duration = 60
-            
-        # Ensure Duration_Seconds column has proper dtype
-        if 'Duration_Seconds' not in self.current_df.columns:
-            self.current_df['Duration_Seconds'] = pd.Series(dtype='float64')
-            
-        self.current_df.at[self.current_row_index, 'Duration_Seconds'] = duration
+        return ratings, duration
+        
+    def confirm_row(self, row_index):
+        """Auto-save a row that was passed over without being shown, as if it had been.
+        
+        An unrated row shown and left without an edit is saved with all zeros
+        (its suggestion, never seen, is not confirmed) and 60 seconds; stored
+        ratings are kept as they are.
+        """
+        ratings, duration, rated = self.rating_store.row(row_index)
+        if not rated:
+            ratings = [0] * len(RATING_COLUMNS)
+        if duration is None or duration <= 0:
+            duration = 60
+        self.save_row(row_index, ratings, duration)
+        
+    def save_row(self, row_index, ratings, duration):
+        """Record a row's ratings in the store and journal it, unless the store already holds them"""
+        stored_ratings, stored_duration, rated = self.rating_store.row(row_index)
+        if rated and stored_ratings == list(ratings) and stored_duration == round(float(duration), 3):
+            return
+        self.rating_store.set_row(row_index, ratings, duration)
+        
+        # Persist the row right away as a small journal append
+        journal = RatingJournal(self.current_csv_path)
+        journal.append(row_index, ratings, duration)
+        
+        self.update_status(f"Auto-saved row {row_index + 1}")
+        self.row_saved(journal)
         
-        self.update_status(f"Auto-saved row {self.current_row_index + 1}")
+    def row_saved(self, journal):
+        """Flag the file as edited after rows were journaled"""
         self.mark_unsaved()
+        self.refresh_file_list_line(self.current_file_index)
         
-    def select_folder(self):
-        folder_path = filedialog.askdirectory(title="Select PwD Dataset Folder")
+        # Fold a long journal back into the rated file
+        if journal.size() > JOURNAL_COMPACT_BYTES:
+            self.request_save(self.current_csv_path, self.current_df, self.rating_store)
+            
+    def toggle_range_mark(self):
+        """Mark the current row as one end of a block of rows to rate at once, or clear the mark"""
+        if self.rating_store is None:
+            return "break"
+        
+        if self.range_mark == (self.current_csv_path, self.current_row_index):
+            self.range_mark = None
+            self.update_status("Range mark cleared")
+        else:
+            self.range_mark = (self.current_csv_path, self.current_row_index)
+            self.update_status(f"Range marked from row {self.current_row_index + 1} | "
+                               "move to the other end and press Ctrl+B to rate the block")
+        return "break"
+    
+    def rate_marked_range(self):
+        """Give every row between the range mark and the current row the current ratings"""
+        if self.rating_store is None:
+            return "break"
+        if self.range_mark is None or self.range_mark[0] != self.current_csv_path:
+            self.update_status("No range marked in this file | Ctrl+M marks one end")
+            return "break"
+        
+        first, last = sorted((self.range_mark[1], self.current_row_index))
+        self.range_mark = None
+        self.rate_rows(np.arange(first, last + 1), f"rows {first + 1}-{last + 1}")
+        return "break"
+    
+    def rate_until_song_change(self):
+        """Give the current row and the unrated rows after it, until the song changes, the current ratings"""
+        if self.rating_store is None or len(self.current_df) == 0:
+            return "break"
+        
+        start = self.current_row_index
+        end = len(self.current_df)
+        if 'Song' in self.current_df.columns:
+            # As in the Plotter, a row without a song continues the previous one
+            songs = self.current_df['Song']
+            songs = songs.where(songs.notna() & (songs.astype(str).str.strip() != '')).ffill().iloc[start:]
+            song = songs.iat[0]
+            changed = songs.notna() & (songs != song) if pd.notna(song) else songs.notna()
+            changes = np.flatnonzero(changed.to_numpy(dtype=bool))
+            if len(changes):
+                end = start + int(changes[0])
+        
+        rows = np.arange(start, end)
+        rows = rows[(rows == start) | ~self.rating_store.rated[start:end]]
+        self.rate_rows(rows, f"{len(rows)} row{'s' if len(rows) != 1 else ''} until the song changes")
+        return "break"
+    
+    def rate_rows(self, rows, description):
+        """Apply the rating controls' ratings and each row's time to the next observation to a block of rows.
+        
+        The block is one update of the rating store and one journal entry.
+        Rows without a next timestamp take the duration in the controls.
+        """
+        if len(self.current_df) == 0:
+            return
+        self.flush_render()
+        ratings, duration = self.read_rating_controls()
+        durations = self.durations_to_next[rows]
+        durations = np.where(np.isnan(durations), duration, durations)
+        
+        self.rating_store.set_rows(rows, ratings, durations)
+        journal = RatingJournal(self.current_csv_path)
+        journal.append_rows(rows, ratings, durations)
+        self.update_status(f"Rated {description} as {'/'.join(map(str, ratings))}")
+        self.row_saved(journal)
+        
+        # Continue after the block; its rows are already saved, so nothing is auto-saved on the way
+        self.current_row_index = min(int(rows.max()) + 1, len(self.current_df) - 1)
+        self.render_current_row()
+        
+    def select_folder(self, folder_path=None):
+        # Without a folder given on the command line, ask for one
+        if folder_path is None:
+            folder_path = filedialog.askdirectory(title="Select PwD Dataset Folder")
         if folder_path:
-            # Find all CSV files ending with "Observations.csv" but NOT "Observations_with_Pittsburgh_Scale.csv"
-            pattern = os.path.join(folder_path, "**", "*Observations.csv")
-            all_csv_files = glob.glob(pattern, recursive=True)
+            self.dataset_folder = folder_path
+            self.search_index = None
+            self.progress = ProgressIndex(folder_path)
+            self.progress.load()
+            self.incomplete_files = None
             
-            # Filter out already processed files
-            self.csv_files = [f for f in all_csv_files 
-                            if not f.endswith("Observations_with_Pittsburgh_Scale.csv")]
+            # Open the first file straight from the saved file index, if there is one,
+            # while the index is checked against the disk in the background
+            index = DatasetIndex(folder_path)
+            if index.load():
+                self.show_dataset_files(folder_path, unrated_observation_files(index))
+                self.update_status("Checking the dataset folder for changes...")
+            else:
+                self.update_status("Scanning the dataset folder...")
             
-            if not self.csv_files:
-                messagebox.showwarning("No Files Found", 
-                                      "No unprocessed CSV files ending with 'Observations.csv' found in the selected folder.")
-                return
+            scan = self.scanner.submit(scan_dataset, index)
+            self.root.after(100, self.poll_scan, scan, folder_path)
             
-            self.folder_label.config(text=f"Folder: {os.path.basename(folder_path)}")
-            self.current_file_index = 0
-            self.load_csv(self.csv_files[0])
+    def poll_scan(self, scan, folder_path):
+        """Take the background scan's file list once it is done"""
+        if not scan.done():
+            self.root.after(100, self.poll_scan, scan, folder_path)
+            return
+        if folder_path != self.dataset_folder:
+            return  # Another folder was selected meanwhile
+        
+        try:
+            csv_files = scan.result()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to scan the dataset folder: {str(e)}")
+            return
+        
+        if csv_files != self.csv_files or self.current_df is None:
+            self.show_dataset_files(folder_path, csv_files)
+        else:
             self.update_status(f"Found {len(self.csv_files)} observation files | Use Arrow Keys to Navigate")
+        
+        # Pick up files rated elsewhere or before the progress index existed
+        progress_scan = self.scanner.submit(scan_progress, folder_path, list(csv_files), self.progress.stamps())
+        self.root.after(100, self.poll_progress_scan, progress_scan, folder_path)
+        
+        # Index the observation text for searching, re-reading only changed files
+        search_build = self.scanner.submit(build_search_index, folder_path, list(csv_files))
+        self.root.after(100, self.poll_search_index, search_build, folder_path)
+        
+    def poll_search_index(self, search_build, folder_path):
+        """Start searching with the background-built index once it is done"""
+        if not search_build.done():
+            self.root.after(100, self.poll_search_index, search_build, folder_path)
+            return
+        if folder_path != self.dataset_folder:
+            return
+        if search_build.exception() is not None:
+            print(f"Could not build the search index: {search_build.exception()}")
+            return
+        self.search_index = search_build.result()
+        
+    def poll_progress_scan(self, progress_scan, folder_path):
+        """Merge the background progress scan into the progress index once it is done"""
+        if not progress_scan.done():
+            self.root.after(100, self.poll_progress_scan, progress_scan, folder_path)
+            return
+        if folder_path != self.dataset_folder or progress_scan.exception() is not None:
+            return
+        
+        found = progress_scan.result()
+        for csv_path, (rated, stamp) in found.items():
+            self.progress.update(csv_path, rated, stamp)
+        if found:
+            self.progress.save()
+            self.progress_changed()
+            
+    def progress_changed(self):
+        """Invalidate what is derived from the progress index"""
+        self.incomplete_files = None
+        self.refresh_file_list()
             
-            # Update window size if needed
-            self.root.update_idletasks()
+    def show_dataset_files(self, folder_path, csv_files):
+        """Use a dataset's file list, opening its first file unless the current one is still in it"""
+        if not csv_files:
+            messagebox.showwarning("No Files Found", 
+                                  "No unprocessed CSV files ending with 'Observations.csv' found in the selected folder.")
+            return
+        
+        previous_files = self.csv_files
+        self.csv_files = csv_files
+        self.incomplete_files = None
+        self.folder_label.config(text=f"Folder: {os.path.basename(folder_path)}")
+        
+        if self.current_csv_path in csv_files and self.current_csv_path in previous_files:
+            # A rescan of the open dataset: stay on the current file
+            self.current_file_index = csv_files.index(self.current_csv_path)
+            self.file_info_label.config(
+                text=f"Current file: {os.path.basename(self.current_csv_path)} ({self.current_file_index + 1}/{len(self.csv_files)})")
+            self.prefetch_neighbours()
+        else:
+            self.prefetcher.clear()
+            self.stash_current_file()
+            self.current_file_index = 0
+            self.load_csv(self.csv_files[0])
+        self.update_status(f"Found {len(self.csv_files)} observation files | Use Arrow Keys to Navigate")
+        
+        # Update window size if needed
+        self.root.update_idletasks()
             
+    def request_suggestions(self):
+        """Compute the current file's rating suggestions in the background, unless already known"""
+        csv_path = self.current_csv_path
+        if csv_path in self.suggestions or csv_path in self.pending_suggestions:
+            return
+        self.pending_suggestions.add(csv_path)
+        future = self.suggester.submit(suggest_ratings, self.current_df, self.lexicon)
+        self.root.after(50, self.poll_suggestions, future, csv_path)
+        
+    def poll_suggestions(self, future, csv_path):
+        """Keep a file's finished suggestions and pre-fill the current row if it is still untouched"""
+        if not future.done():
+            self.root.after(50, self.poll_suggestions, future, csv_path)
+            return
+        self.pending_suggestions.discard(csv_path)
+        if future.exception() is not None:
+            print(f"Could not compute suggestions for {csv_path}: {future.exception()}")
+            return
+        self.suggestions[csv_path] = future.result()
+        
+        if csv_path == self.current_csv_path and self.render_after_id is None and len(self.current_df):
+            untouched = all(var.get() == self.pas_categories[category][0]
+                            for category, var in self.rating_vars.items())
+            if untouched and not self.rating_store.rated[self.current_row_index]:
+                self.display_current_row()
+            if self.row_table is not None and self.row_table.exists():
+                self.row_table.redraw()
+                
+    def suggested_ratings(self, row_index):
+        """Return the suggested ratings of a row of the current file, or None if not computed yet"""
+        suggestions = self.suggestions.get(self.current_csv_path)
+        if suggestions is None:
+            return None
+        return [int(rating) for rating in suggestions[row_index]]
+    
+    def accept_suggestion(self):
+        """Confirm the current row's suggested ratings and move to the next row"""
+        if self.rating_store is None:
+            return "break"
+        
+        if len(self.current_df) == 0:
+            return "break"
+        self.flush_render()
+        suggested = self.suggested_ratings(self.current_row_index)
+        if suggested is None or self.rating_store.rated[self.current_row_index]:
+            self.update_status("No suggestion to accept for this row")
+            return "break"
+        for category, rating in zip(self.pas_categories, suggested):
+            self.rating_vars[category].set(self.pas_categories[category][rating])
+        self.shown_suggestion = None
+        self.next_row()
+        return "break"
+    
+    def database_root(self, csv_path):
+        """Return the dataset folder whose rating database holds csv_path's ratings, or None when only CSV is used"""
+        if self.store == 'csv':
+            return None
+        return self.dataset_roots.get(csv_path, self.dataset_folder)
+    
     def load_csv(self, csv_path):
+        self.dataset_roots.setdefault(csv_path, self.dataset_folder)
         try:
-            self.current_csv_path = csv_path
-            self.current_df = pd.read_csv(csv_path)
-            
-            # Add new columns if they don't exist with proper dtypes
-            rating_columns = ['Aberrant_Vocalization', 'Motor_Agitation', 
-                            'Aggressiveness', 'Resisting_Care']
-            
-            for col in rating_columns:
-                if col not in self.current_df.columns:
-                    # Use Int64 dtype for rating columns (allows NaN values)
-                    self.current_df[col] = pd.Series(dtype='Int64')
-            
-            if 'Duration_Seconds' not in self.current_df.columns:
-                # Use float64 for duration
-                self.current_df['Duration_Seconds'] = pd.Series(dtype='float64')
-            
-            # Check for existing processed file and load ratings if available
-            self.existing_data_label.config(text="")
-            existing_file = self.check_for_existing_processed_file(csv_path)
-            if existing_file:
-                if messagebox.askyesno("Existing Data Found", 
-                                      f"Found previous ratings for this file.\n\nLoad existing ratings?"):
-                    self.load_existing_ratings(existing_file)
-            
-            self.current_row_index = 0
-            self.display_current_row()
-            self.display_next_row()
-            self.update_time_calculation()
-            self.clear_unsaved()
+            # A file opened earlier in this session comes back as it was left
+            cached = self.file_cache.take(csv_path)
+            if cached:
+                self.restore_cached_file(csv_path, cached)
+            else:
+                self.open_file(csv_path)
+            self.request_suggestions()
             
             filename = os.path.basename(csv_path)
             self.file_info_label.config(
@@ -588,6 +1907,351 @@ Alt+←→: Navigate files"""
             
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load CSV: {str(e)}")
+        
+        self.prefetch_neighbours()
+        
+    def open_file(self, csv_path):
+        """Open a file not cached in this session, offering to load its previous ratings"""
+        # Use the background read if the file was prefetched
+        prepared = (self.prefetcher.take(csv_path) or
+                    read_observation_file(csv_path, self.database_root(csv_path)))
+        self.current_csv_path = csv_path
+        self.current_df = prepared['df']
+        self.current_df_nbytes = prepared['nbytes']
+        self.durations_to_next = prepared['durations_to_next']
+        
+        # Check for existing processed file and load ratings if available
+        self.existing_data_label.config(text="")
+        existing_file = prepared['existing_path']
+        if existing_file:
+            if messagebox.askyesno("Existing Data Found", 
+                                  f"Found previous ratings for this file.\n\nLoad existing ratings?"):
+                self.load_existing_ratings(existing_file, prepared['existing_df'])
+        
+        # Ratings are edited in the store; the DataFrame is only updated at save time
+        self.rating_store = RatingStore.from_frame(self.current_df)
+        
+        # Recover rows rated after the last save, e.g. before a crash
+        restored = RatingJournal(csv_path).replay(self.rating_store)
+        
+        self.current_row_index = 0
+        self.render_current_row()
+        if restored:
+            self.existing_data_label.config(
+                text=f"✓ Recovered {restored} unsaved rows from the journal", foreground="green")
+            self.mark_unsaved()
+        else:
+            self.clear_unsaved()
+        
+    def restore_cached_file(self, csv_path, cached):
+        """Switch back to a cached file with its row cursor and unsaved edits"""
+        self.current_csv_path = csv_path
+        self.current_df = cached['df']
+        self.current_df_nbytes = cached['df_nbytes']
+        self.rating_store = cached['store']
+        self.durations_to_next = cached['durations_to_next']
+        self.current_row_index = cached['row']
+        self.existing_data_label.config(text="✓ Restored from this session", foreground="green")
+        
+        self.render_current_row()
+        if cached['unsaved']:
+            self.mark_unsaved()
+        else:
+            self.clear_unsaved()
+            
+    def stash_current_file(self):
+        """Keep the current file and its edits in the cache before switching away"""
+        if self.current_df is not None:
+            evicted = self.file_cache.put(self.current_csv_path, {
+                'df': self.current_df,
+                'df_nbytes': self.current_df_nbytes,
+                'store': self.rating_store,
+                'durations_to_next': self.durations_to_next,
+                'row': self.current_row_index,
+                'unsaved': self.unsaved_changes,
+            })
+            # Files pushed out of the cache with unsaved edits are written now
+            for csv_path, entry in evicted:
+                self.request_save(csv_path, entry['df'], entry['store'])
+            
+    def save_cached_files(self):
+        """Queue every cached file that has unsaved edits for writing"""
+        for csv_path in self.file_cache.unsaved_paths():
+            entry = self.file_cache.entries[csv_path]
+            self.request_save(csv_path, entry['df'], entry['store'])
+            self.file_cache.mark_saved(csv_path)
+            
+    def request_save(self, csv_path, df, store):
+        """Hand a snapshot of df with the store's ratings to the background writer and watch for its completion"""
+        # The journal so far is covered by this snapshot and can be dropped once it
+        # is written; the position counts bytes already compacted away
+        journal_position = self.journal_trimmed.get(csv_path, 0) + RatingJournal(csv_path).size()
+        self.writer.save(csv_path, store.to_frame(df), token=(journal_position, store.rated.copy()),
+                         database_root=self.database_root(csv_path))
+        self.save_state_label.config(text="⏳ Saving...", foreground="orange")
+        if not self.polling_saves:
+            self.polling_saves = True
+            self.root.after(100, self.poll_saves)
+            
+    def poll_saves(self):
+        """Report finished background writes; runs on the UI thread while saves are in flight"""
+        failed = []
+        # Asked before draining: once the writer is idle every result is already queued
+        busy = self.writer.busy()
+        while True:
+            try:
+                csv_path, error, (journal_position, rated) = self.writer.results.get_nowait()
+            except queue.Empty:
+                break
+            if error is None:
+                trimmed = self.journal_trimmed.get(csv_path, 0)
+                trimmed += RatingJournal(csv_path).compact(journal_position - trimmed)
+                self.journal_trimmed[csv_path] = trimmed
+                self.record_progress(csv_path, rated)
+            else:
+                failed.append((csv_path, error))
+                # Keep the edits flagged so they are saved again
+                if csv_path == self.current_csv_path:
+                    self.mark_unsaved()
+                elif csv_path in self.file_cache:
+                    self.file_cache.entries[csv_path]['unsaved'] = True
+        
+        if busy:
+            self.root.after(100, self.poll_saves)
+        else:
+            self.polling_saves = False
+            if failed:
+                self.save_state_label.config(text="✗ Save failed", foreground="red")
+            else:
+                self.save_state_label.config(text=f"✓ Saved {datetime.now():%H:%M:%S}", foreground="green")
+        
+        for csv_path, error in failed:
+            messagebox.showerror("Error", f"Failed to save {os.path.basename(csv_path)}: {str(error)}")
+            
+    def record_progress(self, csv_path, rated):
+        """Update the progress index after a file of the open dataset was saved"""
+        if self.progress is None or os.path.relpath(csv_path, self.dataset_folder).startswith('..'):
+            return
+        self.progress.update(csv_path, rated, rated_copy_stamp(csv_path))
+        self.progress.save()
+        self.progress_changed()
+        
+    def file_completion(self, csv_path):
+        """Return (rated rows, rows) of a file, from its open rating store if it has one, else None"""
+        if csv_path == self.current_csv_path and self.rating_store is not None:
+            store = self.rating_store
+        elif csv_path in self.file_cache:
+            store = self.file_cache.entries[csv_path]['store']
+        else:
+            return self.progress.completion(csv_path) if self.progress else None
+        return int(store.rated.sum()), len(store)
+    
+    def jump_to_next_unrated_row(self):
+        """Move to the next row without a rating, wrapping around to the first"""
+        if self.rating_store is None:
+            return "break"
+        
+        self.flush_render()
+        # The current row counts as rated once it is auto-saved on leaving
+        row_index = self.rating_store.next_unrated(self.current_row_index)
+        if row_index is None or row_index == self.current_row_index:
+            self.update_status("All rows in this file are rated | Ctrl+Shift+N: next incomplete file")
+        else:
+            self.move_to_row(row_index)
+            self.update_status(f"Jumped to unrated row {row_index + 1}")
+        return "break"
+    
+    def jump_to_next_incomplete_file(self):
+        """Open the next file with unrated rows, going by the saved progress"""
+        if not self.csv_files:
+            return "break"
+        
+        if self.incomplete_files is None:
+            self.incomplete_files = OpenSlotFinder(
+                [not self.progress.is_complete(path) for path in self.csv_files])
+        file_index = self.incomplete_files.find_wrapping(self.current_file_index)
+        while file_index is not None and file_index != self.current_file_index:
+            # Files rated in this session but not saved yet are judged by their live ratings
+            done = self.file_completion(self.csv_files[file_index])
+            if done is None or done[0] < done[1]:
+                self.go_to_file(file_index)
+                self.update_status(f"Opened next incomplete file ({file_index + 1}/{len(self.csv_files)})")
+                return "break"
+            self.incomplete_files.close(file_index)
+            file_index = self.incomplete_files.find_wrapping(file_index)
+        
+        self.update_status("No other incomplete files in this dataset")
+        return "break"
+    
+    def show_row_table(self):
+        """Open (or raise) the table of all rows of the current file"""
+        if self.current_df is None:
+            return "break"
+        if self.row_table is not None and self.row_table.exists():
+            self.row_table.lift()
+        else:
+            self.row_table = RowTable(self)
+        self.row_table.show_row(self.current_row_index)
+        return "break"
+    
+    def show_search(self):
+        """Open (or raise) the observation search window"""
+        if self.search_window is not None and self.search_window.winfo_exists():
+            self.search_window.lift()
+            self.search_entry.focus_set()
+            return "break"
+        
+        window = tk.Toplevel(self.root)
+        window.title("Search Observations")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(2, weight=1)
+        
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(window, textvariable=self.search_var, width=50)
+        self.search_entry.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E), padx=5, pady=5)
+        self.search_result_label = ttk.Label(window, text="Type words and press Enter", font=('Arial', 9),
+                                             foreground='gray')
+        self.search_result_label.grid(row=1, column=0, columnspan=2, sticky=tk.W, padx=5)
+        
+        self.search_listbox = tk.Listbox(window, width=90, height=20, font=('Courier', 10), activestyle='none')
+        self.search_listbox.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=self.search_listbox.yview)
+        scrollbar.grid(row=2, column=1, sticky=(tk.N, tk.S))
+        self.search_listbox.config(yscrollcommand=scrollbar.set)
+        
+        self.search_entry.bind('<Return>', lambda e: self.run_search())
+        self.search_listbox.bind('<Double-Button-1>', lambda e: self.open_selected_hit())
+        self.search_listbox.bind('<Return>', lambda e: self.open_selected_hit())
+        
+        self.search_window = window
+        self.search_entry.focus_set()
+        return "break"
+    
+    def run_search(self):
+        """Look up the search box's words and list the hits"""
+        if self.search_index is None:
+            self.search_result_label.config(text="The search index is still being built, try again shortly")
+            return "break"
+        
+        self.search_hits = self.search_index.search(self.search_var.get())
+        self.search_position = -1
+        self.search_listbox.delete(0, tk.END)
+        self.search_listbox.insert(tk.END, *(f"{os.path.relpath(csv_path, self.dataset_folder)}  row {row + 1}"
+                                             for csv_path, row in self.search_hits))
+        self.search_result_label.config(
+            text=f"{len(self.search_hits)} matching rows | Enter/double-click to open, F3/Shift+F3 to walk")
+        if self.search_hits:
+            self.walk_search_hits(1)
+        return "break"
+    
+    def open_selected_hit(self):
+        selection = self.search_listbox.curselection()
+        if selection:
+            self.show_search_hit(selection[0])
+        return "break"
+    
+    def walk_search_hits(self, step):
+        """Go to the next (step 1) or previous (step -1) search hit, wrapping around"""
+        if not self.search_hits:
+            return "break"
+        self.show_search_hit((self.search_position + step) % len(self.search_hits))
+        return "break"
+    
+    def show_search_hit(self, position):
+        """Open a hit's file if needed and move the cursor to its row"""
+        csv_path, row_index = self.search_hits[position]
+        if csv_path not in self.csv_files:
+            return
+        self.search_position = position
+        
+        if csv_path != self.current_csv_path:
+            self.go_to_file(self.csv_files.index(csv_path))
+            # Show the hit straight away, without auto-saving the row the file opened at
+            self.current_row_index = min(row_index, len(self.current_df) - 1)
+            self.render_current_row()
+        else:
+            self.move_to_row(row_index)
+        
+        if self.search_window is not None and self.search_window.winfo_exists():
+            self.search_listbox.selection_clear(0, tk.END)
+            self.search_listbox.selection_set(position)
+            self.search_listbox.see(position)
+        self.update_status(f"Search hit {position + 1}/{len(self.search_hits)}: row {row_index + 1}")
+        
+    def show_file_list(self):
+        """Open (or raise) a window listing the dataset's files with their completion"""
+        if not self.csv_files:
+            return "break"
+        if self.file_list_window is not None and self.file_list_window.winfo_exists():
+            self.file_list_window.lift()
+            self.refresh_file_list()
+            return "break"
+        
+        window = tk.Toplevel(self.root)
+        window.title("Dataset Files")
+        window.columnconfigure(0, weight=1)
+        window.rowconfigure(0, weight=1)
+        
+        self.file_listbox = tk.Listbox(window, width=90, height=25, font=('Courier', 10), activestyle='none')
+        self.file_listbox.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=self.file_listbox.yview)
+        scrollbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        self.file_listbox.config(yscrollcommand=scrollbar.set)
+        
+        ttk.Label(window, text="Double-click or Enter to open a file", font=('Arial', 9),
+                  foreground='gray').grid(row=1, column=0, columnspan=2, pady=2)
+        
+        self.file_listbox.bind('<Double-Button-1>', lambda e: self.open_selected_file())
+        self.file_listbox.bind('<Return>', lambda e: self.open_selected_file())
+        
+        self.file_list_window = window
+        self.refresh_file_list()
+        return "break"
+    
+    def refresh_file_list(self):
+        """Redraw the file list's completion column, if the window is open"""
+        if self.file_list_window is None or not self.file_list_window.winfo_exists():
+            return
+        
+        self.file_list_lines = [self.file_list_line(i) for i in range(len(self.csv_files))]
+        self.file_listbox.delete(0, tk.END)
+        self.file_listbox.insert(tk.END, *self.file_list_lines)
+        self.file_listbox.see(self.current_file_index)
+        
+    def refresh_file_list_line(self, file_index):
+        """Redraw one file's line of the file list, if the window is open and its completion changed"""
+        if self.file_list_window is None or not self.file_list_window.winfo_exists():
+            return
+        
+        line = self.file_list_line(file_index)
+        if line == self.file_list_lines[file_index]:
+            return
+        selected = file_index in self.file_listbox.curselection()
+        self.file_listbox.delete(file_index)
+        self.file_listbox.insert(file_index, line)
+        if selected:
+            self.file_listbox.selection_set(file_index)
+        self.file_list_lines[file_index] = line
+        
+    def file_list_line(self, file_index):
+        """Return the file list's text for a file: current-file marker, completion and path"""
+        csv_path = self.csv_files[file_index]
+        done = self.file_completion(csv_path)
+        percent = "   --" if done is None or done[1] == 0 else f"{100 * done[0] / done[1]:4.0f}%"
+        marker = "▶" if file_index == self.current_file_index else " "
+        return f"{marker} {percent}  {os.path.relpath(csv_path, self.dataset_folder)}"
+        
+    def open_selected_file(self):
+        selection = self.file_listbox.curselection()
+        if selection and selection[0] != self.current_file_index:
+            self.go_to_file(selection[0])
+        return "break"
+    
+    def prefetch_neighbours(self):
+        """Read the previous and next files in the background while the current one is rated"""
+        neighbours = [self.csv_files[i] for i in (self.current_file_index + 1, self.current_file_index - 1)
+                      if 0 <= i < len(self.csv_files) and self.csv_files[i] not in self.file_cache]
+        self.prefetcher.prefetch(neighbours, None if self.store == 'csv' else self.dataset_folder)
     
     def update_time_calculation(self):
         """Update the calculated time duration display"""
@@ -603,122 +2267,114 @@ Alt+←→: Navigate files"""
             else:
                 display_text = f"{int(self.calculated_duration)} seconds"
             
-            self.time_calc_label.config(text=display_text, foreground='blue')
-            self.apply_duration_btn.config(state='normal')
+            self.update_widget(self.time_calc_label, text=display_text, foreground='blue')
+            self.update_widget(self.apply_duration_btn, state='normal')
         else:
-            self.time_calc_label.config(text="-- seconds", foreground='gray')
-            self.apply_duration_btn.config(state='disabled')
+            self.update_widget(self.time_calc_label, text="-- seconds", foreground='gray')
+            self.update_widget(self.apply_duration_btn, state='disabled')
             
+    def row_display(self, row_index):
+        """Return the header label texts and observation text of a row, read column by column"""
+        df = self.current_df
+        headers = {col: f"{col}: {df[col].iat[row_index]}" if col in df.columns else f"{col}: --"
+                   for col in ('Time', 'Song', 'Score')}
+        
+        if 'Observation' in df.columns:
+            text = str(df['Observation'].iat[row_index])
+        else:
+            # If no specific Observation column, show all other data
+            text = "".join(f"{col}: {df[col].iat[row_index]}\n"
+                           for col in df.columns if col not in NON_TEXT_COLUMNS)
+        return headers, text
+        
     def display_current_row(self):
         if self.current_df is None or len(self.current_df) == 0:
             return
             
-        row = self.current_df.iloc[self.current_row_index]
+        headers, text = self.row_display(self.current_row_index)
         
         # Update header labels
-        if 'Time' in row:
-            self.time_label.config(text=f"Time: {row['Time']}")
-        if 'Song' in row:
-            self.song_label.config(text=f"Song: {row['Song']}")
-        if 'Score' in row:
-            self.score_label.config(text=f"Score: {row['Score']}")
+        self.update_widget(self.time_label, text=headers['Time'])
+        self.update_widget(self.song_label, text=headers['Song'])
+        self.update_widget(self.score_label, text=headers['Score'])
         
         # Display main observation text
-        self.observation_text.config(state=tk.NORMAL)
-        self.observation_text.delete(1.0, tk.END)
-        if 'Observation' in row:
-            self.observation_text.insert(1.0, str(row['Observation']))
-        else:
-            # If no specific Observation column, show all other data
-            display_text = ""
-            for col in self.current_df.columns:
-                if col not in ['Aberrant_Vocalization', 'Motor_Agitation', 
-                              'Aggressiveness', 'Resisting_Care', 'Duration_Seconds',
-                              'Time', 'Song', 'Score']:
-                    display_text += f"{col}: {row[col]}\n"
-            self.observation_text.insert(1.0, display_text)
-        self.observation_text.config(state=tk.DISABLED)
+        self.set_text(self.observation_text, text)
         
         # Update row info
-        self.row_info_label.config(
-            text=f"Row: {self.current_row_index + 1}/{len(self.current_df)}")
-        self.current_row_label.config(
-            text=f"Current\nRow: {self.current_row_index + 1}")
-        
-        # Load existing ratings if present
-        has_ratings = False
-        for category in self.pas_categories:
-            col_name = category.replace(' ', '_')
-            if col_name in row and pd.notna(row[col_name]) and row[col_name] != '':
-                # Find the matching option from the dropdown
-                rating_value = str(int(row[col_name])) if pd.notna(row[col_name]) else '0'
-                for option in self.pas_categories[category]:
-                    if option.startswith(rating_value + ' -'):
-                        self.rating_vars[category].set(option)
-                        has_ratings = True
-                        break
-            else:
-                self.rating_vars[category].set(self.pas_categories[category][0])
-        
-        if 'Duration_Seconds' in row and pd.notna(row['Duration_Seconds']) and row['Duration_Seconds'] != '':
-            self.duration_var.set(str(int(row['Duration_Seconds']) if row['Duration_Seconds'] % 1 == 0 else row['Duration_Seconds']))
+        self.update_widget(self.row_info_label,
+                           text=f"Row: {self.current_row_index + 1}/{len(self.current_df)}")
+        self.update_widget(self.current_row_label,
+                           text=f"Current\nRow: {self.current_row_index + 1}")
+        
+        # Load existing ratings from the store; unrated rows show their suggestion, or 0
+        ratings, duration, rated = self.rating_store.row(self.current_row_index)
+        suggested = None if rated else self.suggested_ratings(self.current_row_index)
+        if not rated:
+            ratings = suggested or [0] * len(RATING_COLUMNS)
+        for category, rating in zip(self.pas_categories, ratings):
+            self.set_var(self.rating_vars[category], self.pas_categories[category][rating])
+        self.shown_suggestion = suggested if suggested is not None and any(suggested) else None
+        self.update_widget(self.suggestion_label,
+                           text="💡 Suggested from the observation text, not confirmed | Ctrl+Enter: accept"
+                           if self.shown_suggestion is not None else "")
+        
+        if duration is not None:
+            self.set_var(self.duration_var, str(int(duration) if duration % 1 == 0 else duration))
         else:
-            self.duration_var.set("60")  # Default to 60 seconds (10 minutes)
+            self.set_var(self.duration_var, "60")  # Default to 60 seconds (10 minutes)
             
     def display_next_row(self):
         """Display preview of the next row"""
         if self.current_df is None or len(self.current_df) == 0:
             return
             
-        self.next_observation_text.config(state=tk.NORMAL)
-        
         if self.current_row_index < len(self.current_df) - 1:
-            next_row = self.current_df.iloc[self.current_row_index + 1]
-            
-            # Update next row header labels
-            if 'Time' in next_row:
-                self.next_time_label.config(text=f"Time: {next_row['Time']}")
-            else:
-                self.next_time_label.config(text="Time: --")
-                
-            if 'Song' in next_row:
-                self.next_song_label.config(text=f"Song: {next_row['Song']}")
-            else:
-                self.next_song_label.config(text="Song: --")
-                
-            if 'Score' in next_row:
-                self.next_score_label.config(text=f"Score: {next_row['Score']}")
-            else:
-                self.next_score_label.config(text="Score: --")
-            
-            # Display next observation text
-            self.next_observation_text.delete(1.0, tk.END)
-            if 'Observation' in next_row:
-                self.next_observation_text.insert(1.0, str(next_row['Observation']))
-            else:
-                display_text = ""
-                for col in self.current_df.columns:
-                    if col not in ['Aberrant_Vocalization', 'Motor_Agitation', 
-                                  'Aggressiveness', 'Resisting_Care', 'Duration_Seconds',
-                                  'Time', 'Song', 'Score']:
-                        display_text += f"{col}: {next_row[col]}\n"
-                self.next_observation_text.insert(1.0, display_text)
+            headers, text = self.row_display(self.current_row_index + 1)
         else:
             # No next row
-            self.next_time_label.config(text="Time: --")
-            self.next_song_label.config(text="Song: --")
-            self.next_score_label.config(text="Score: --")
-            self.next_observation_text.delete(1.0, tk.END)
-            self.next_observation_text.insert(1.0, "No more observations in this file")
+            headers = {col: f"{col}: --" for col in ('Time', 'Song', 'Score')}
+            text = "No more observations in this file"
+        
+        # Update next row header labels
+        self.update_widget(self.next_time_label, text=headers['Time'])
+        self.update_widget(self.next_song_label, text=headers['Song'])
+        self.update_widget(self.next_score_label, text=headers['Score'])
+        
+        # Display next observation text
+        self.set_text(self.next_observation_text, text)
+        
+    def update_widget(self, widget, **options):
+        """Reconfigure a widget with only the options whose values changed"""
+        state = self.widget_state.setdefault(widget, {})
+        changed = {key: value for key, value in options.items() if state.get(key) != value}
+        if changed:
+            widget.config(**changed)
+            state.update(changed)
             
-        self.next_observation_text.config(state=tk.DISABLED)
+    def set_text(self, text_widget, text):
+        """Replace the contents of a read-only Text widget unless it already shows text"""
+        state = self.widget_state.setdefault(text_widget, {})
+        if state.get('contents') == text:
+            return
+        text_widget.config(state=tk.NORMAL)
+        text_widget.delete(1.0, tk.END)
+        text_widget.insert(1.0, text)
+        text_widget.config(state=tk.DISABLED)
+        state['contents'] = text
+        
+    def set_var(self, var, value):
+        """Set a Tk variable only if its value changes, to spare the bound widget a redraw"""
+        if var.get() != value:
+            var.set(value)
             
     def set_all_zero(self):
         """Set all ratings to 0 (Not present) for quick entry"""
+        self.flush_render()
         for category in self.pas_categories:
             self.rating_vars[category].set(self.pas_categories[category][0])
         self.update_status("All ratings set to 0 - Not present")
-        self.mark_unsaved()
+        self.ratings_edited()
         return "break"  # Prevent event propagation
         
     def save_file(self):
@@ -728,95 +2384,169 @@ Alt+←→: Navigate files"""
         # Auto-save current row before saving file
         self.auto_save_current_row()
         
-        # Generate new filename
-        base_name = os.path.basename(self.current_csv_path)
-        dir_name = os.path.dirname(self.current_csv_path)
+        new_name = os.path.basename(processed_file_path(self.current_csv_path))
+        
+        # Written in the background; a failure flags the file as unsaved again
+        self.request_save(self.current_csv_path, self.current_df, self.rating_store)
+        self.update_status(f"Saving to {new_name}")
+        self.clear_unsaved()
         
-        # Change to new naming convention
-        new_name = base_name.replace("Observations.csv", "Observations_with_Pittsburgh_Scale.csv")
-        new_path = os.path.join(dir_name, new_name)
+        return "break"  # Prevent event propagation
+            
+    def export_csv(self):
+        """Write the current file's ratings as its CSV rated copy, whichever store is in use"""
+        if self.current_df is None or self.current_csv_path is None:
+            return "break"
         
+        self.auto_save_current_row()
         try:
-            self.current_df.to_csv(new_path, index=False)
-            self.update_status(f"Saved to {new_name}")
-            self.clear_unsaved()
-            messagebox.showinfo("Success", f"File saved as:\n{new_name}")
+            new_path = write_rated_file(self.current_csv_path, self.rating_store.to_frame(self.current_df))
+            self.update_status(f"Exported {os.path.basename(new_path)}")
         except Exception as e:
-            messagebox.showerror("Error", f"Failed to save file: {str(e)}")
-        
+            messagebox.showerror("Error", f"Failed to export CSV: {str(e)}")
         return "break"  # Prevent event propagation
-            
+    
     def next_csv(self):
         if self.current_file_index < len(self.csv_files) - 1:
-            # Auto-save current row before switching
-            self.auto_save_current_row()
-            
-            if self.unsaved_changes:
-                if messagebox.askyesno("Save Changes", "Save current file before moving to next?"):
-                    self.save_file()
-            
-            self.current_file_index += 1
-            self.load_csv(self.csv_files[self.current_file_index])
+            self.go_to_file(self.current_file_index + 1)
         return "break"  # Prevent event propagation
             
     def previous_csv(self):
         if self.current_file_index > 0:
-            # Auto-save current row before switching
-            self.auto_save_current_row()
-            
-            if self.unsaved_changes:
-                if messagebox.askyesno("Save Changes", "Save current file before moving to previous?"):
-                    self.save_file()
-            
-            self.current_file_index -= 1
-            self.load_csv(self.csv_files[self.current_file_index])
+            self.go_to_file(self.current_file_index - 1)
         return "break"  # Prevent event propagation
+    
+    def go_to_file(self, file_index):
+        """Switch to another file of the dataset, keeping the current one's edits in the cache"""
+        # Auto-save current row before switching
+        self.auto_save_current_row()
+        
+        # Unsaved edits stay with the file in the cache until saved
+        self.stash_current_file()
+        
+        self.current_file_index = file_index
+        self.load_csv(self.csv_files[self.current_file_index])
+        self.refresh_file_list()
             
     def next_row(self):
         if self.current_df is not None and self.current_row_index < len(self.current_df) - 1:
-            # Auto-save current row before moving
-            self.auto_save_current_row()
-            
-            self.current_row_index += 1
-            self.display_current_row()
-            self.display_next_row()
-            self.update_time_calculation()
-            
-            # Remove focus from any widget to ensure arrow keys keep working
-            self.root.focus_set()
+            self.move_to_row(self.current_row_index + 1)
         return "break"  # Prevent event propagation
             
     def previous_row(self):
-        if self.current_row_index > 0:
+        if self.current_df is not None and self.current_row_index > 0:
+            self.move_to_row(self.current_row_index - 1)
+        return "break"  # Prevent event propagation
+    
+    def move_to_row(self, row_index):
+        """Move the cursor to a row and render it once the pending key events are handled.
+        
+        Holding an arrow key queues events faster than rows can be drawn, so
+        rendering waits until Tk is idle: the rows passed over in between are
+        auto-saved from the store without being drawn, and only the last one
+        is shown.
+        """
+        if self.render_after_id is None:
             # Auto-save current row before moving
             self.auto_save_current_row()
+        else:
+            self.confirm_row(self.current_row_index)
+        
+        self.current_row_index = row_index
+        if self.render_after_id is None:
+            self.render_after_id = self.root.after_idle(self.render_current_row)
             
-            self.current_row_index -= 1
-            self.display_current_row()
-            self.display_next_row()
-            self.update_time_calculation()
-            
-            # Remove focus from any widget to ensure arrow keys keep working
-            self.root.focus_set()
-        return "break"  # Prevent event propagation
+    def render_current_row(self):
+        """Show the current row, the next-row preview and the time to the next observation"""
+        if self.render_after_id is not None:
+            self.root.after_cancel(self.render_after_id)
+            self.render_after_id = None
+        
+        self.display_current_row()
+        self.display_next_row()
+        self.update_time_calculation()
+        if self.row_table is not None and self.row_table.exists():
+            self.row_table.show_row(self.current_row_index)
+        
+        # Remove focus from any widget to ensure arrow keys keep working
+        self.root.focus_set()
+        
+    def flush_render(self):
+        """Render a pending row now, so the rating controls show the current row"""
+        if self.render_after_id is not None:
+            self.render_current_row()
             
     def on_closing(self):
         """Handle window closing event"""
-        if self.unsaved_changes:
+        if self.unsaved_changes or self.file_cache.unsaved_paths():
             if messagebox.askyesnocancel("Save Changes", "Do you want to save changes before closing?"):
-                self.save_file()
-                self.root.destroy()
+                if self.unsaved_changes:
+                    self.save_file()
+                self.save_cached_files()
+                self.close()
             elif messagebox.askyesno("Confirm", "Close without saving?"):
-                self.root.destroy()
+                # Unsaved edits are given up, so they must not be recovered next time
+                unsaved_paths = self.file_cache.unsaved_paths()
+                if self.unsaved_changes:
+                    unsaved_paths.append(self.current_csv_path)
+                for csv_path in unsaved_paths:
+                    RatingJournal(csv_path).discard()
+                self.close()
         else:
-            self.root.destroy()
+            self.close()
+            
+    def close(self):
+        """Finish pending saves, stop background work and destroy the window"""
+        self.prefetcher.shutdown()
+        self.scanner.shutdown(wait=False, cancel_futures=True)
+        self.suggester.shutdown(wait=False, cancel_futures=True)
+        self.writer.close()
+        self.poll_saves()
+        self.root.destroy()
             
     def update_status(self, message):
-        self.status_label.config(text=message)
+        self.update_widget(self.status_label, text=message)
+
+def parse_args(argv=None):
+    """Parse the command line; the folder is optional and can still be chosen in the window"""
+    parser = argparse.ArgumentParser(
+        description="Rate PwD observation files on the Pittsburgh Agitation Scale.")
+    parser.add_argument('folder', nargs='?',
+                        help="PwD dataset folder to open at startup")
+    parser.add_argument('--cache-mb', type=int, default=DEFAULT_CACHE_MB,
+                        help=f"memory kept for recently opened files (default: {DEFAULT_CACHE_MB})")
+    parser.add_argument('--lexicon',
+                        help="JSON file of {category column: {regex: rating}} used to suggest ratings "
+                             "(default: a built-in lexicon)")
+    parser.add_argument('--store', choices=RATING_STORES, default='csv',
+                        help=f"save ratings as CSV copies, in the dataset's {RATING_DATABASE_NAME} "
+                             "database, or both (default: csv)")
+    parser.add_argument('--last-duration', type=float, default=DEFAULT_LAST_DURATION,
+                        help="seconds given to a file's last row when filling all durations "
+                             f"(default: {DEFAULT_LAST_DURATION})")
+    parser.add_argument('--max-gap', type=float, default=DEFAULT_MAX_GAP_SECONDS,
+                        help="seconds between observations above which a gap is reported instead of "
+                             f"used when filling all durations (default: {DEFAULT_MAX_GAP_SECONDS})")
+    
+    args = parser.parse_args(argv)
+    if args.folder is not None and not os.path.isdir(args.folder):
+        parser.error(f"folder not found: {args.folder}")
+    if args.lexicon is not None:
+        try:
+            args.lexicon = load_lexicon(args.lexicon)
+        except (OSError, ValueError) as e:
+            parser.error(f"could not load lexicon {args.lexicon}: {e}")
+    return args
 
-def main():
+def main(argv=None):
+    args = parse_args(argv)
+    
     root = tk.Tk()
-    app = PittsburghObservationTool(root)
+    app = PittsburghObservationTool(root, cache_mb=args.cache_mb, store=args.store, lexicon=args.lexicon,
+                                    last_duration=args.last_duration, max_gap=args.max_gap)
+    if args.folder:
+        # Open the folder once the window is up
+        root.after_idle(lambda: app.select_folder(args.folder))
     root.mainloop()
 
 if __name__ == "__main__":
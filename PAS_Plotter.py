@@ -1,19 +1,151 @@
 import os
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
+import sys
+import argparse
 from datetime import datetime, timedelta
-import glob
-import re
-from matplotlib.patches import Rectangle
-import matplotlib.patches as mpatches
-import tkinter as tk
-from tkinter import filedialog, messagebox
+import importlib.util
+import io
+import contextlib
+import traceback
+import hashlib
+import json
 import textwrap
+from PAS_Common import (RATING_DATABASE_NAME, RatingDatabase, find_dataset_files, lazy_import,
+                        parse_time_to_seconds, parse_time_column, session_date_from_path,
+                        write_json_atomic)
+
+# pandas and numpy load on first use, so argument parsing doesn't wait for them;
+# matplotlib is only imported when a plot is rendered
+pd = lazy_import('pandas')
+np = lazy_import('numpy')
+
+# Output formats: the dense 1-second series, only the rows where a value changes, or both
+OUTPUT_FORMATS = ('dense', 'changepoints', 'both')
+
+# File formats for the written time series tables
+TABLE_FORMATS = ('csv', 'parquet')
+
+# Plot rendering: step functions from change points, or one point per second
+PLOT_MODES = ('step', 'dense')
+
+# Compact column types for generated time series (ratings are 0-4, the total at most 16)
+TIME_SERIES_DTYPES = {
+    'Time_Seconds': 'int32',
+    'End_Seconds': 'int32',
+    'Aberrant_Vocalization': 'uint8',
+    'Motor_Agitation': 'uint8',
+    'Aggressiveness': 'uint8',
+    'Resisting_Care': 'uint8',
+    'Total_Agitation': 'uint8',
+    'Current_Song': 'category',
+}
+
+# Manifest of processed inputs, kept in the dataset root for incremental rebuilds
+MANIFEST_NAME = '.pas_timeseries_manifest.json'
+MANIFEST_VERSION = 1
+
+def file_sha256(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class BuildManifest:
+    """Size, mtime and content hash of each processed input, with the settings it was built with.
+    
+    Inputs read from the rating database are tracked by their revision there instead.
+    """
+    
+    def __init__(self, folder_path):
+        self.folder_path = folder_path
+        self.path = os.path.join(folder_path, MANIFEST_NAME)
+        self.entries = {}
+        
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == MANIFEST_VERSION:
+                self.entries = data.get('files', {})
+        except (OSError, ValueError):
+            pass  # Missing or unreadable manifest: everything is rebuilt
+    
+    def key(self, obs_file):
+        return os.path.relpath(obs_file, self.folder_path)
+    
+    def is_current(self, obs_file, settings, outputs, revision=None):
+        """Check whether an input's outputs are present and built from its current contents"""
+        entry = self.entries.get(self.key(obs_file))
+        if entry is None or entry['settings'] != settings:
+            return False
+        if sorted(entry['outputs']) != sorted(self.key(path) for path in outputs):
+            return False
+        if not all(os.path.exists(path) for path in outputs):
+            return False
+        if revision is not None:
+            return entry.get('revision') == revision
+        
+        stat = os.stat(obs_file)
+        if stat.st_size != entry['size']:
+            return False
+        if stat.st_mtime_ns == entry['mtime_ns']:
+            return True
+        
+        # Touched but possibly unchanged: compare contents before rebuilding
+        if file_sha256(obs_file) != entry['sha256']:
+            return False
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return True
+    
+    def record(self, obs_file, settings, outputs, revision=None):
+        if revision is not None:
+            self.entries[self.key(obs_file)] = {
+                'revision': revision,
+                'settings': settings,
+                'outputs': [self.key(path) for path in outputs],
+            }
+            return
+        
+        stat = os.stat(obs_file)
+        self.entries[self.key(obs_file)] = {
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': file_sha256(obs_file),
+            'settings': settings,
+            'outputs': [self.key(path) for path in outputs],
+        }
+    
+    def forget(self, obs_file):
+        self.entries.pop(self.key(obs_file), None)
+    
+    def prune(self, observation_files):
+        """Drop entries for inputs that no longer exist"""
+        keep = {self.key(path) for path in observation_files}
+        self.entries = {key: entry for key, entry in self.entries.items() if key in keep}
+    
+    def save(self):
+        write_json_atomic(self.path, {'version': MANIFEST_VERSION, 'files': self.entries})
 
 class PittsburghTimeSeriesGenerator:
-    def __init__(self):
+    def __init__(self, output_format='dense', table_format='csv', plot_mode='step', database=None):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"output_format must be one of {OUTPUT_FORMATS}, got {output_format!r}")
+        if table_format not in TABLE_FORMATS:
+            raise ValueError(f"table_format must be one of {TABLE_FORMATS}, got {table_format!r}")
+        if plot_mode not in PLOT_MODES:
+            raise ValueError(f"plot_mode must be one of {PLOT_MODES}, got {plot_mode!r}")
+        if table_format == 'parquet' and not any(importlib.util.find_spec(m) for m in ('pyarrow', 'fastparquet')):
+            raise ImportError("Parquet output requires pyarrow or fastparquet (pip install pyarrow)")
+        self.output_format = output_format
+        self.table_format = table_format
+        self.plot_mode = plot_mode
+        # Dataset folder whose rating database is read instead of the rated CSV copies
+        self.database = database
+        
+        # Constructor arguments, used to rebuild the generator in pool workers
+        self.settings = {'output_format': output_format, 'table_format': table_format, 'plot_mode': plot_mode}
+        if database is not None:
+            self.settings['database'] = database
         self.pittsburgh_columns = [
             'Aberrant_Vocalization',
             'Motor_Agitation', 
@@ -23,42 +155,7 @@ class PittsburghTimeSeriesGenerator:
         
     def parse_time_to_seconds(self, time_str):
         """Convert time string to seconds from start of day"""
-        if pd.isna(time_str) or time_str == '':
-            return None
-            
-        time_str = str(time_str).strip()
-        
-        # Try different time formats
-        formats = [
-            '%H:%M:%S',      # 14:30:45
-            '%H:%M',         # 14:30
-            '%I:%M %p',      # 2:30 PM
-            '%I:%M:%S %p',   # 2:30:45 PM
-            '%H.%M.%S',      # 14.30.45
-            '%H.%M',         # 14.30
-        ]
-        
-        for fmt in formats:
-            try:
-                time_obj = datetime.strptime(time_str, fmt)
-                # Calculate seconds from midnight
-                return time_obj.hour * 3600 + time_obj.minute * 60 + time_obj.second
-            except ValueError:
-                continue
-        
-        # Try to extract numbers for minutes:seconds format
-        match = re.match(r'(\d+):(\d+)', time_str)
-        if match:
-            minutes = int(match.group(1))
-            seconds = int(match.group(2))
-            if minutes < 60:  # Likely minutes:seconds
-                return minutes * 60 + seconds
-        
-        # Try to parse as just seconds
-        try:
-            return float(time_str)
-        except ValueError:
-            return None
+        return parse_time_to_seconds(time_str)
     
     def seconds_to_time_string(self, seconds):
         """Convert seconds from start of day to time string"""
@@ -78,138 +175,256 @@ class PittsburghTimeSeriesGenerator:
         
         return datetime.combine(base_date, datetime.min.time()) + timedelta(hours=hours, minutes=minutes, seconds=secs)
     
-    def process_observation_file(self, filepath):
-        """Process a single observation file and generate time series"""
-        print(f"\nProcessing: {os.path.basename(filepath)}")
-        
-        # Read the observation file
-        df = pd.read_csv(filepath)
+    def seconds_to_datetime64(self, seconds, base_date):
+        """Convert an array of seconds from start of day to datetime64[s] in one step"""
+        offsets = np.floor(np.asarray(seconds, dtype=float)).astype(np.int64).astype('timedelta64[s]')
+        return np.datetime64(base_date, 's') + offsets
+    
+    def time_strings(self, seconds):
+        """Format an array of seconds from start of day as HH:MM:SS strings"""
+        seconds = np.floor(np.asarray(seconds, dtype=float)).astype(np.int64)
+        hours, rem = np.divmod(seconds, 3600)
+        minutes, secs = np.divmod(rem, 60)
+        
+        # Look up zero-padded fields instead of formatting every second
+        padded = np.array([f"{i:02d}" for i in range(max(int(hours.max(initial=0)) + 1, 60))], dtype=object)
+        return padded[hours] + ':' + padded[minutes] + ':' + padded[secs]
+    
+    def with_time_strings(self, df):
+        """Return a shallow copy of a time series with its Time column formatted for output.
+        
+        The Time strings are only a view of Time_Seconds, so they are built
+        when a table is written rather than kept in memory.
+        """
+        out = df.copy(deep=False)
+        out.insert(out.columns.get_loc('Datetime'), 'Time', self.time_strings(df['Time_Seconds']))
+        return out
+    
+    def load_observation_file(self, filepath):
+        """Read an observation file and parse its Time column, or return None if unusable"""
+        if self.database is not None:
+            with RatingDatabase(self.database, create=False) as database:
+                df = database.read_file(filepath)
+            if df is None:
+                print(f"  Warning: {filepath} is not in the rating database")
+                return None
+        else:
+            df = pd.read_csv(filepath)
         
         # Check if it has the required columns
         if not all(col in df.columns for col in self.pittsburgh_columns):
             print(f"  Warning: Missing Pittsburgh columns in {filepath}")
-            return None, None
+            return None
             
         # Get time information
         if 'Time' not in df.columns:
             print(f"  Warning: No Time column in {filepath}")
-            return None, None
-        
-        # Parse times and durations
-        time_seconds = []
-        durations = []
+            return None
         
-        for idx, row in df.iterrows():
-            time_sec = self.parse_time_to_seconds(row['Time'])
-            if time_sec is not None:
-                time_seconds.append(time_sec)
-                
-                # Get duration (default to 600 seconds if not specified)
-                duration = row.get('Duration_Seconds', 600)
-                if pd.isna(duration) or duration == '':
-                    duration = 600
-                durations.append(float(duration))
+        # Parse the whole Time column once; every later stage reuses Time_Seconds
+        df['Time_Seconds'] = parse_time_column(df['Time'])
         
-        if not time_seconds:
+        if df['Time_Seconds'].isna().all():
             print(f"  Warning: No valid timestamps found in {filepath}")
-            return None, None
+            return None
         
-        # Create time series from first to last observation + last duration
-        start_time = min(time_seconds)
-        end_time = max(time_seconds) + durations[-1]  # Add last observation's duration
+        return df
+    
+    def build_intervals(self, obs_df):
+        """Convert observations to [start, end) intervals with ratings and song.
+        
+        Returns the interval table together with the session start and end in
+        seconds. The session runs from the first observation to the last
+        observation plus its duration; intervals are clipped to it.
+        """
+        obs = obs_df[obs_df['Time_Seconds'].notna()]
         
-        # Create 1-second interval time series
-        time_range = np.arange(start_time, end_time, 1)  # 1-second intervals
+        # Get durations (default to 600 seconds if not specified)
+        if 'Duration_Seconds' in obs.columns:
+            durations = pd.to_numeric(obs['Duration_Seconds'], errors='coerce').fillna(600).to_numpy(dtype=float)
+        else:
+            durations = np.full(len(obs), 600.0)
         
-        # Initialize time series dataframe
+        # Create time series from first to last observation + last duration
+        time_seconds = obs['Time_Seconds'].to_numpy(dtype=float)
+        session_start = time_seconds.min()
+        session_end = time_seconds.max() + durations[-1]  # Add last observation's duration
+        n_seconds = len(np.arange(session_start, session_end, 1))
+        
+        # Interval offsets from the session start, truncated like the 1-second grid
+        start_idx = np.minimum(np.trunc(time_seconds - session_start), n_seconds).astype(np.int64)
+        end_idx = np.clip(np.trunc(start_idx + durations), start_idx, n_seconds).astype(np.int64)
+        
+        # Whole seconds from here on; a fractional first timestamp starts its own second
+        first_second = int(np.floor(session_start))
+        intervals = pd.DataFrame({
+            'Start_Seconds': first_second + start_idx,
+            'End_Seconds': first_second + end_idx,
+        })
+        
+        total = np.zeros(len(obs), dtype=np.uint8)
+        for col in self.pittsburgh_columns:
+            scores = np.trunc(pd.to_numeric(obs[col], errors='coerce').fillna(0).to_numpy(dtype=float))
+            if ((scores < 0) | (scores > 4)).any():
+                print(f"  Warning: {col} has ratings outside 0-4; clipping them")
+            intervals[col] = np.clip(scores, 0, 4).astype(np.uint8)
+            total += intervals[col].to_numpy()
+        intervals['Total_Agitation'] = total
+        
+        if 'Song' in obs.columns:
+            codes, categories = self.encode_songs(obs['Song'])
+            intervals['Song'] = pd.Categorical.from_codes(codes, categories)
+        
+        return intervals, first_second, first_second + n_seconds
+    
+    def build_change_points(self, intervals, session_start, session_end, base_date):
+        """Collapse overlapping intervals into rows where any value changes.
+        
+        Later observations overwrite earlier ones, as in the 1-second grid. Each
+        returned row holds its values from Time_Seconds until End_Seconds, and
+        the rows together cover the whole session without gaps.
+        """
+        starts = intervals['Start_Seconds'].to_numpy()
+        ends = intervals['End_Seconds'].to_numpy()
+        bounds = np.unique(np.concatenate([[session_start, session_end], starts, ends]))
+        
+        # Segment i spans bounds[i]..bounds[i+1]; record the last interval covering it,
+        # and separately the last song, since observations without a song keep the previous one
+        owner = np.full(len(bounds) - 1, -1)
+        song_codes = intervals['Song'].cat.codes.to_numpy() if 'Song' in intervals.columns else None
+        if song_codes is not None:
+            categories = intervals['Song'].cat.categories
+            segment_songs = np.full(len(bounds) - 1, categories.get_loc(''))
+        for k, (lo, hi) in enumerate(zip(np.searchsorted(bounds, starts), np.searchsorted(bounds, ends))):
+            owner[lo:hi] = k
+            if song_codes is not None and song_codes[k] >= 0:
+                segment_songs[lo:hi] = song_codes[k]
+        
+        covered = owner >= 0
+        columns = self.pittsburgh_columns + ['Total_Agitation']
+        values = np.column_stack([np.where(covered, intervals[col].to_numpy()[np.maximum(owner, 0)], 0)
+                                  for col in columns])
+        if song_codes is not None and (song_codes >= 0).any():
+            values = np.column_stack([values, segment_songs])
+        
+        # Keep only the segments whose values differ from the previous one
+        changed = np.ones(len(values), dtype=bool)
+        changed[1:] = (values[1:] != values[:-1]).any(axis=1)
+        
+        cp_df = pd.DataFrame({'Time_Seconds': bounds[:-1][changed].astype(np.int32)})
+        cp_df['End_Seconds'] = np.append(cp_df['Time_Seconds'].to_numpy()[1:], session_end).astype(np.int32)
+        for i, col in enumerate(columns):
+            cp_df[col] = values[changed, i].astype(np.uint8)
+        if values.shape[1] > len(columns):
+            cp_df['Current_Song'] = pd.Categorical.from_codes(values[changed, -1], categories)
+        
+        cp_df.insert(2, 'Datetime', self.seconds_to_datetime64(cp_df['Time_Seconds'], base_date))
+        return cp_df
+    
+    def expand_change_points(self, cp_df):
+        """Expand change-point rows to the dense 1-second time series"""
+        lengths = (cp_df['End_Seconds'] - cp_df['Time_Seconds']).to_numpy().astype(np.int64)
+        offsets = np.arange(lengths.sum())
+        
+        # Initialize time series dataframe; Time strings are added on output
+        start = np.datetime64(pd.Timestamp(cp_df['Datetime'].iloc[0]), 's')
         ts_data = {
-            'Time_Seconds': time_range,
-            'Time': [self.seconds_to_time_string(t) for t in time_range],
-            'Datetime': [self.seconds_to_datetime(t) for t in time_range]
+            'Time_Seconds': (cp_df['Time_Seconds'].iloc[0] + offsets).astype(np.int32),
+            'Datetime': start + offsets.astype('timedelta64[s]')
         }
         
-        # Initialize Pittsburgh columns with zeros
-        for col in self.pittsburgh_columns:
-            ts_data[col] = np.zeros(len(time_range))
+        # Repeat each change point's values for the seconds it holds
+        for col in self.pittsburgh_columns + ['Total_Agitation']:
+            ts_data[col] = np.repeat(cp_df[col].to_numpy(dtype=np.uint8), lengths)
         
-        # Add Total_Agitation column (sum of all 4 parameters)
-        ts_data['Total_Agitation'] = np.zeros(len(time_range))
+        if 'Current_Song' in cp_df.columns:
+            songs = cp_df['Current_Song'].astype(object).fillna('').astype('category')
+            codes = np.repeat(songs.cat.codes.to_numpy(), lengths)
+            ts_data['Current_Song'] = pd.Categorical.from_codes(codes, songs.cat.categories)
         
-        # Fill in the observations
-        for idx, row in df.iterrows():
-            time_sec = self.parse_time_to_seconds(row['Time'])
-            if time_sec is None:
-                continue
-                
-            duration = row.get('Duration_Seconds', 600)
-            if pd.isna(duration) or duration == '':
-                duration = 600
-            else:
-                duration = float(duration)
-            
-            # Find the start index in time series
-            start_idx = int(time_sec - start_time)
-            end_idx = min(int(start_idx + duration), len(time_range))
-            
-            # Fill in the Pittsburgh scores for the duration
-            total_score = 0
-            for col in self.pittsburgh_columns:
-                score = row.get(col, 0)
-                if pd.isna(score) or score == '':
-                    score = 0
-                else:
-                    score = int(float(score))
-                
-                ts_data[col][start_idx:end_idx] = score
-                total_score += score
-            
-            # Update total agitation
-            ts_data['Total_Agitation'][start_idx:end_idx] = total_score
+        return pd.DataFrame(ts_data)
+    
+    def observation_file_to_change_points(self, filepath):
+        """Process a single observation file into change points"""
+        print(f"\nProcessing: {os.path.basename(filepath)}")
         
-        # Create DataFrame
-        ts_df = pd.DataFrame(ts_data)
+        df = self.load_observation_file(filepath)
+        if df is None:
+            return None, None
         
-        # Add metadata columns
-        if 'Song' in df.columns and not df['Song'].isna().all():
-            ts_df['Current_Song'] = self.propagate_song_info(df, ts_df)
+        intervals, session_start, session_end = self.build_intervals(df)
+        if session_end <= session_start:
+            print(f"  Warning: Observations in {filepath} span no time")
+            return None, None
         
-        print(f"  Generated {len(ts_df)} seconds of time series data")
-        print(f"  Time range: {ts_df['Time'].iloc[0]} to {ts_df['Time'].iloc[-1]}")
+        base_date = session_date_from_path(filepath)
+        cp_df = self.build_change_points(intervals, session_start, session_end, base_date)
         
-        return ts_df, df  # Return both time series and original observations
+        print(f"  Generated {len(cp_df)} change points over {int(session_end - session_start)} seconds")
+        print(f"  Time range: {self.seconds_to_time_string(session_start)} to "
+              f"{self.seconds_to_time_string(session_end - 1)}")
+        
+        return cp_df, df
     
-    def propagate_song_info(self, obs_df, ts_df):
-        """Propagate song information to time series"""
-        songs = [''] * len(ts_df)
+    def process_observation_file(self, filepath):
+        """Process a single observation file and generate time series"""
+        cp_df, df = self.observation_file_to_change_points(filepath)
+        if cp_df is None:
+            return None, None
         
-        for idx, row in obs_df.iterrows():
-            if pd.notna(row.get('Song', '')):
-                time_sec = self.parse_time_to_seconds(row['Time'])
-                if time_sec is not None:
-                    duration = row.get('Duration_Seconds', 600)
-                    if pd.isna(duration):
-                        duration = 600
-                    
-                    start_idx = int(time_sec - ts_df['Time_Seconds'].iloc[0])
-                    end_idx = min(int(start_idx + duration), len(ts_df))
-                    
-                    for i in range(start_idx, end_idx):
-                        if i < len(songs):
-                            songs[i] = str(row['Song'])
+        ts_df = self.expand_change_points(cp_df)
+        print(f"  Generated {len(ts_df)} seconds of time series data")
         
-        return songs
+        return ts_df, df  # Return both time series and original observations
+    
+    def encode_songs(self, songs):
+        """Encode songs as integer codes into categories that always include '' (no song).
+        
+        Missing songs get code -1.
+        """
+        songs = pd.Series(songs, dtype=object).reset_index(drop=True)
+        present = songs.notna().to_numpy()
+        labels = [str(song) for song in songs[present]]
+        
+        categories = pd.Index(sorted(set(labels) | {''}))
+        codes = np.full(len(songs), -1, dtype=np.int32)
+        codes[present] = categories.get_indexer(labels)
+        return codes, categories
+    
+    def plot_values(self, values, step):
+        """Return a column's plot values; a step series repeats its last value at the session end"""
+        values = values.to_numpy()
+        return np.append(values, values[-1]) if step else values
+    
+    def series_stats(self, values, lengths=None):
+        """Return mean, max and percentage of active (non-zero) time, weighting change points by duration"""
+        values = values.to_numpy()
+        if lengths is None:
+            lengths = np.ones(len(values), dtype=np.int64)
+        total = lengths.sum()
+        mean_val = (values * lengths).sum() / total
+        non_zero_pct = lengths[values > 0].sum() / total * 100
+        return mean_val, values.max(), non_zero_pct
     
     def plot_time_series_with_annotations(self, ts_df, obs_df, original_file, save_path):
-        """Create a visualization of the time series data with song and observation annotations"""
+        """Create a visualization of the time series data with song and observation annotations.
+        
+        ts_df may be the dense 1-second series or its change points, which are
+        drawn as step functions and look the same at a fraction of the vertices.
+        """
+        import matplotlib.pyplot as plt
+        import matplotlib.dates as mdates
+        import matplotlib.patches as mpatches
         
         # Prepare annotations from observation data
+        base_date = session_date_from_path(original_file)
         annotations = []
         music_start = None
         music_end = None
         
         for idx, row in obs_df.iterrows():
-            time_sec = self.parse_time_to_seconds(row['Time'])
-            if time_sec is None:
+            time_sec = row['Time_Seconds']
+            if pd.isna(time_sec):
                 continue
             
             # Build annotation text - FULL TEXT WITHOUT TRUNCATION
@@ -230,7 +445,7 @@ class PittsburghTimeSeriesGenerator:
                 text_parts.append(obs_text)
             
             if text_parts:  # Only add annotation if there's text
-                annotation_time = self.seconds_to_datetime(time_sec)
+                annotation_time = self.seconds_to_datetime(time_sec, base_date)
                 # Join with separator for single-line display
                 annotations.append({
                     'time': annotation_time,
@@ -242,15 +457,28 @@ class PittsburghTimeSeriesGenerator:
                 if pd.notna(row.get('Song', '')) and str(row['Song']).strip():
                     if music_start is None:
                         music_start = annotation_time
-                    music_end = annotation_time + timedelta(seconds=float(row.get('Duration_Seconds', 600)))
+                    duration = row.get('Duration_Seconds', 600)
+                    if pd.isna(duration):
+                        duration = 600
+                    music_end = annotation_time + timedelta(seconds=float(duration))
         
         # Create figure with extended width for 45-degree annotations
         fig, axes = plt.subplots(5, 1, figsize=(28, 16), sharex=True)
         fig.suptitle(f'Pittsburgh Agitation Scale Time Series with Annotations\n{os.path.basename(original_file)}', 
                     fontsize=16, fontweight='bold')
         
-        # Use datetime for x-axis
-        x_time = ts_df['Datetime']
+        # Use datetime for x-axis. Change points are drawn as step functions with
+        # one vertex pair per change; a dense series has one point per second.
+        step = 'End_Seconds' in ts_df.columns
+        if step:
+            lengths = (ts_df['End_Seconds'] - ts_df['Time_Seconds']).to_numpy(dtype=np.int64)
+            end_time = ts_df['Datetime'].to_numpy()[-1] + np.timedelta64(int(lengths[-1]), 's')
+            x_time = np.append(ts_df['Datetime'].to_numpy(), end_time)
+        else:
+            lengths = None
+            x_time = ts_df['Datetime']
+        drawstyle = 'steps-post' if step else 'default'
+        fill_step = 'post' if step else None
         
         # Color scheme for different levels
         colors = ['green', 'yellow', 'orange', 'red', 'darkred']
@@ -261,8 +489,9 @@ class PittsburghTimeSeriesGenerator:
             ax = axes[idx]
             
             # Plot the data
-            ax.plot(x_time, ts_df[col], linewidth=1.5, color='darkblue', label=col.replace('_', ' '))
-            ax.fill_between(x_time, 0, ts_df[col], alpha=0.3, color='blue')
+            values = self.plot_values(ts_df[col], step)
+            ax.plot(x_time, values, linewidth=1.5, color='darkblue', label=col.replace('_', ' '), drawstyle=drawstyle)
+            ax.fill_between(x_time, 0, values, alpha=0.3, color='blue', step=fill_step)
             
             # Add colored background for severity levels
             for level in range(5):
@@ -278,9 +507,7 @@ class PittsburghTimeSeriesGenerator:
             ax.grid(True, alpha=0.3, axis='y')
             
             # Add statistics
-            mean_val = ts_df[col].mean()
-            max_val = ts_df[col].max()
-            non_zero_pct = (ts_df[col] > 0).mean() * 100
+            mean_val, max_val, non_zero_pct = self.series_stats(ts_df[col], lengths)
             
             stats_text = f'Mean: {mean_val:.2f} | Max: {max_val} | Active: {non_zero_pct:.1f}%'
             ax.text(0.02, 0.95, stats_text, transform=ax.transAxes, 
@@ -289,8 +516,9 @@ class PittsburghTimeSeriesGenerator:
         
         # Plot total agitation score
         ax = axes[4]
-        ax.plot(x_time, ts_df['Total_Agitation'], linewidth=2, color='darkviolet')
-        ax.fill_between(x_time, 0, ts_df['Total_Agitation'], alpha=0.3, color='purple')
+        values = self.plot_values(ts_df['Total_Agitation'], step)
+        ax.plot(x_time, values, linewidth=2, color='darkviolet', drawstyle=drawstyle)
+        ax.fill_between(x_time, 0, values, alpha=0.3, color='purple', step=fill_step)
         
         # Add music period shading
         if music_start and music_end:
@@ -327,9 +555,7 @@ class PittsburghTimeSeriesGenerator:
                 )
         
         # Add statistics for total
-        mean_val = ts_df['Total_Agitation'].mean()
-        max_val = ts_df['Total_Agitation'].max()
-        non_zero_pct = (ts_df['Total_Agitation'] > 0).mean() * 100
+        mean_val, max_val, non_zero_pct = self.series_stats(ts_df['Total_Agitation'], lengths)
         
         stats_text = f'Mean: {mean_val:.2f} | Max: {max_val} | Active: {non_zero_pct:.1f}%'
         ax.text(0.02, 0.95, stats_text, transform=ax.transAxes, 
@@ -364,87 +590,269 @@ class PittsburghTimeSeriesGenerator:
         
         return plot_file
     
-    def process_folder(self, folder_path):
-        """Process all observation files in a folder"""
-        # Find all files ending with Pittsburgh observations
-        pattern = os.path.join(folder_path, "**", "*Observations_with_Pittsburgh_Scale.csv")
-        observation_files = glob.glob(pattern, recursive=True)
+    def write_table(self, df, path):
+        """Write a time series as CSV or Parquet, keeping its compact column types"""
+        table = self.with_time_strings(df)
+        if self.table_format == 'parquet':
+            path = os.path.splitext(path)[0] + '.parquet'
+            table.to_parquet(path, index=False)
+        else:
+            table.to_csv(path, index=False)
+        return path
+    
+    def read_time_series(self, path):
+        """Read a written time series back with its compact column types"""
+        if path.endswith('.parquet'):
+            df = pd.read_parquet(path)
+        else:
+            header = pd.read_csv(path, nrows=0).columns
+            df = pd.read_csv(path, keep_default_na=False, parse_dates=['Datetime'],
+                             dtype={col: dtype for col, dtype in TIME_SERIES_DTYPES.items() if col in header})
+        df['Datetime'] = df['Datetime'].astype('datetime64[s]')
+        
+        # Time strings are a view of Time_Seconds and are rebuilt on output
+        return df.drop(columns='Time', errors='ignore')
+    
+    def output_paths(self, obs_file):
+        """Return the dense and change-point time series paths for an observation file"""
+        base_name = os.path.basename(obs_file)
+        dir_name = os.path.dirname(obs_file)
+        
+        # Replace the suffix to indicate time series
+        dense_name = base_name.replace("Observations_with_Pittsburgh_Scale.csv", "Pittsburgh_TimeSeries_1sec.csv")
+        cp_name = base_name.replace("Observations_with_Pittsburgh_Scale.csv", "Pittsburgh_TimeSeries_changepoints.csv")
+        return os.path.join(dir_name, dense_name), os.path.join(dir_name, cp_name)
+    
+    def expected_outputs(self, obs_file):
+        """Return the path process_file reports for an input and every file it writes"""
+        dense_path, cp_path = self.output_paths(obs_file)
+        extension = '.parquet' if self.table_format == 'parquet' else '.csv'
+        
+        tables = {}
+        if self.output_format in ('changepoints', 'both'):
+            tables['changepoints'] = os.path.splitext(cp_path)[0] + extension
+        if self.output_format in ('dense', 'both'):
+            tables['dense'] = os.path.splitext(dense_path)[0] + extension
+        
+        primary = tables['changepoints'] if self.output_format == 'changepoints' else tables['dense']
+        plot_file = dense_path.replace('.csv', '_annotated_plot.png')
+        return primary, list(tables.values()) + [plot_file]
+    
+    def process_file(self, obs_file):
+        """Generate the time series and annotated plot for one file, returning the output path"""
+        cp_df, obs_df = self.observation_file_to_change_points(obs_file)
+        if cp_df is None or obs_df is None:
+            return None
         
-        if not observation_files:
-            print(f"\n⚠️  No files ending with 'Observations_with_Pittsburgh_Scale.csv' found in {folder_path}")
-            print("   Please ensure you have processed observation files with the Pittsburgh Scale first.")
-            return []
+        dense_path, cp_path = self.output_paths(obs_file)
         
-        print(f"\n✅ Found {len(observation_files)} observation files to process")
-        print("="*60)
+        # The dense series is only built when it is written or plotted
+        needs_dense = self.output_format in ('dense', 'both') or self.plot_mode == 'dense'
+        ts_df = self.expand_change_points(cp_df) if needs_dense else None
         
-        processed_files = []
+        # Save the time series in the requested format(s)
+        written = {}
+        if self.output_format in ('changepoints', 'both'):
+            written['changepoints'] = self.write_table(cp_df, cp_path)
+            print(f"  ✓ Saved change points: {os.path.basename(written['changepoints'])}")
+        if self.output_format in ('dense', 'both'):
+            written['dense'] = self.write_table(ts_df, dense_path)
+            print(f"  ✓ Saved time series: {os.path.basename(written['dense'])}")
+        
+        # Create and save annotated plot
+        plot_data = cp_df if self.plot_mode == 'step' else ts_df
+        self.plot_time_series_with_annotations(plot_data, obs_df, obs_file, dense_path)
+        print(f"  ✓ Created annotated plot with 45-degree labels")
+        
+        return written['changepoints'] if self.output_format == 'changepoints' else written['dense']
+    
+    def expand_change_point_file(self, cp_path):
+        """Write the dense 1-second time series for a saved change-point file"""
+        ts_df = self.expand_change_points(self.read_time_series(cp_path))
+        
+        dense_path = cp_path.replace("Pittsburgh_TimeSeries_changepoints", "Pittsburgh_TimeSeries_1sec")
+        dense_path = self.write_table(ts_df, dense_path)
+        print(f"  ✓ Expanded {os.path.basename(cp_path)} to {os.path.basename(dense_path)}")
+        return dense_path
+    
+    def process_files(self, observation_files):
+        """Process files one after another, returning each file's output path (None on failure)"""
+        results = {}
         
         for i, obs_file in enumerate(observation_files, 1):
             print(f"\n[{i}/{len(observation_files)}] Processing file...")
             
             try:
-                # Generate time series
-                ts_df, obs_df = self.process_observation_file(obs_file)
-                
-                if ts_df is not None and obs_df is not None:
-                    # Create output filename
-                    base_name = os.path.basename(obs_file)
-                    dir_name = os.path.dirname(obs_file)
-                    
-                    # Replace the suffix to indicate time series
-                    output_name = base_name.replace(
-                        "Observations_with_Pittsburgh_Scale.csv",
-                        "Pittsburgh_TimeSeries_1sec.csv"
-                    )
-                    output_path = os.path.join(dir_name, output_name)
-                    
-                    # Save the time series
-                    ts_df.to_csv(output_path, index=False)
-                    print(f"  ✓ Saved time series: {os.path.basename(output_name)}")
-                    
-                    # Create and save annotated plot
-                    self.plot_time_series_with_annotations(ts_df, obs_df, obs_file, output_path)
-                    print(f"  ✓ Created annotated plot with 45-degree labels")
-                    
-                    processed_files.append(output_path)
-                else:
+                results[obs_file] = self.process_file(obs_file)
+                if results[obs_file] is None:
                     print(f"  ⚠️  Skipped: Could not process {os.path.basename(obs_file)}")
                     
             except Exception as e:
                 print(f"  ❌ Error processing {os.path.basename(obs_file)}: {str(e)}")
-                import traceback
                 traceback.print_exc()
                 continue
         
+        return results
+    
+    def process_files_in_pool(self, observation_files, workers):
+        """Process files across worker processes, reporting results in file order.
+        
+        Each worker renders with its own Agg backend and captures its output,
+        which is printed here once the file's turn comes, so the log reads the
+        same as a sequential run. A failing file is reported and skipped.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+        
+        print(f"   Using {workers} worker processes")
+        results = {}
+        
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_pool_worker) as pool:
+            futures = [pool.submit(_process_file_in_worker, self.settings, obs_file)
+                       for obs_file in observation_files]
+            
+            for i, (obs_file, future) in enumerate(zip(observation_files, futures), 1):
+                print(f"\n[{i}/{len(observation_files)}] Processing file...")
+                
+                try:
+                    output_path, log = future.result()
+                except Exception as e:
+                    # The worker itself failed (e.g. it was killed); other files continue
+                    print(f"  ❌ Error processing {os.path.basename(obs_file)}: {str(e)}")
+                    continue
+                
+                print(log, end='')
+                results[obs_file] = output_path
+        
+        return results
+    
+    def process_folder(self, folder_path, workers=1, force=False):
+        """Process all observation files in a folder, optionally across a pool of worker processes.
+        
+        Inputs whose size, mtime (or, failing that, content hash) and settings
+        match the manifest in the folder, and whose outputs all exist, are
+        skipped unless force is set.
+        """
+        # Find all files ending with Pittsburgh observations, through the dataset's file index,
+        # or the files stored in the rating database
+        revisions = {}
+        if self.database is not None:
+            with RatingDatabase(self.database, create=False) as database:
+                observation_files = database.files()
+                revisions = database.revisions()
+        else:
+            observation_files = find_dataset_files(folder_path, "Observations_with_Pittsburgh_Scale.csv")
+        
+        if not observation_files:
+            if self.database is not None:
+                print(f"\n⚠️  No rated files in the rating database of {folder_path}")
+            else:
+                print(f"\n⚠️  No files ending with 'Observations_with_Pittsburgh_Scale.csv' found in {folder_path}")
+            print("   Please ensure you have processed observation files with the Pittsburgh Scale first.")
+            return []
+        
+        print(f"\n✅ Found {len(observation_files)} observation files to process")
+        
+        # Only rebuild inputs that changed since the last run, or whose outputs are missing
+        manifest = BuildManifest(folder_path)
+        manifest.prune(observation_files)
+        expected = {obs_file: self.expected_outputs(obs_file) for obs_file in observation_files}
+        if force:
+            stale_files = observation_files
+        else:
+            stale_files = [obs_file for obs_file in observation_files
+                           if not manifest.is_current(obs_file, self.settings, expected[obs_file][1],
+                                                      revisions.get(obs_file))]
+            if len(stale_files) < len(observation_files):
+                print(f"   Skipping {len(observation_files) - len(stale_files)} unchanged files (force to rebuild)")
+        print("="*60)
+        
+        if workers > 1 and len(stale_files) > 1:
+            results = self.process_files_in_pool(stale_files, workers)
+        else:
+            results = self.process_files(stale_files)
+        
+        for obs_file in stale_files:
+            if results.get(obs_file) is not None:
+                manifest.record(obs_file, self.settings, expected[obs_file][1], revisions.get(obs_file))
+            else:
+                manifest.forget(obs_file)
+        manifest.save()
+        
+        # Report unchanged files with their existing outputs, in discovery order
+        stale_set = set(stale_files)
+        processed_files = []
+        for obs_file in observation_files:
+            output_path = results.get(obs_file) if obs_file in stale_set else expected[obs_file][0]
+            if output_path is not None:
+                processed_files.append(output_path)
+        
         print(f"\n{'='*60}")
         print(f"🎉 Processing complete!")
-        print(f"   Generated {len(processed_files)} time series files with annotated plots")
+        print(f"   Generated {sum(path is not None for path in results.values())} time series files with annotated plots")
         print(f"   All files saved in their respective directories")
         
         return processed_files
 
-def main():
-    """Main function to run the time series generator"""
+def _init_pool_worker():
+    """Give each pool worker its own non-interactive Agg backend"""
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _process_file_in_worker(settings, obs_file):
+    """Process one file in a pool worker, returning its output path and captured log"""
+    log = io.StringIO()
+    output_path = None
     
-    print("\n" + "="*70)
-    print(" PITTSBURGH AGITATION SCALE - TIME SERIES GENERATOR ")
-    print("="*70)
+    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            output_path = PittsburghTimeSeriesGenerator(**settings).process_file(obs_file)
+            if output_path is None:
+                print(f"  ⚠️  Skipped: Could not process {os.path.basename(obs_file)}")
+        except Exception as e:
+            print(f"  ❌ Error processing {os.path.basename(obs_file)}: {str(e)}")
+            traceback.print_exc()
     
-    print("\n📋 INSTRUCTIONS:")
-    print("   1. This tool converts Pittsburgh Scale observations to time series data")
-    print("   2. It creates 1-second resolution data with annotated visualizations")
-    print("   3. ALL annotations displayed at the same level with 45-degree rotation")
-    print("   4. You need to select the folder containing your processed observation files")
-    print("   5. Files must end with '_Observations_with_Pittsburgh_Scale.csv'")
-    print("\n" + "-"*70)
+    return output_path, log.getvalue()
+
+def parse_args(argv=None):
+    """Parse the command line; every option has a default so the tool can run unattended"""
+    parser = argparse.ArgumentParser(
+        description="Convert Pittsburgh Scale observation files (*_Observations_with_Pittsburgh_Scale.csv) "
+                    "to time series data with annotated plots.")
+    parser.add_argument('folder', nargs='?',
+                        help="dataset folder to process; a folder dialog opens if omitted")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes (default: 1)")
+    parser.add_argument('--output-format', choices=OUTPUT_FORMATS, default='dense',
+                        help="time series to write (default: dense)")
+    parser.add_argument('--table-format', choices=TABLE_FORMATS, default='csv',
+                        help="file format of the time series (default: csv)")
+    parser.add_argument('--plot-mode', choices=PLOT_MODES, default='step',
+                        help="how plots draw the ratings (default: step)")
+    parser.add_argument('--force', action='store_true',
+                        help="rebuild every file, even if unchanged since the last run")
+    parser.add_argument('--db', action='store_true',
+                        help=f"read ratings from the folder's {RATING_DATABASE_NAME} database "
+                             "instead of the rated CSV copies")
+    
+    args = parser.parse_args(argv)
+    if args.folder is not None and not os.path.isdir(args.folder):
+        parser.error(f"folder not found: {args.folder}")
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    return args
+
+def ask_for_folder():
+    """Ask for the dataset folder with a Tk dialog (interactive fallback)"""
+    import tkinter as tk
+    from tkinter import filedialog, messagebox
     
     # Create root window (hidden)
     root = tk.Tk()
     root.withdraw()
     
     # Show message box with instructions
-    response = messagebox.showinfo(
+    messagebox.showinfo(
         "Pittsburgh Time Series Generator",
         "Please select the folder containing your Pittsburgh observation files.\n\n" +
         "The tool will:\n" +
@@ -463,16 +871,17 @@ def main():
     )
     
     if not folder_path:
-        print("\n❌ No folder selected. Exiting.")
         messagebox.showwarning("Cancelled", "No folder selected. The program will now exit.")
-        return
-    
-    print(f"\n📁 Selected folder: {folder_path}")
-    print("-"*70)
+    root.destroy()
+    return folder_path
+
+def show_result_dialog(processed_files):
+    """Report the outcome in a message box (interactive fallback)"""
+    import tkinter as tk
+    from tkinter import messagebox
     
-    # Create generator and process folder
-    generator = PittsburghTimeSeriesGenerator()
-    processed_files = generator.process_folder(folder_path)
+    root = tk.Tk()
+    root.withdraw()
     
     if processed_files:
         # Show completion message
@@ -480,11 +889,10 @@ def main():
             "Processing Complete!",
             f"Successfully processed {len(processed_files)} files!\n\n" +
             "Generated outputs:\n" +
-            "• Time series CSV files (*_Pittsburgh_TimeSeries_1sec.csv)\n" +
+            "• Time series files (*_Pittsburgh_TimeSeries_*)\n" +
             "• Annotated plot images with 45° labels (*_annotated_plot.png)\n\n" +
             "All files saved in their original directories."
         )
-        print("\n✅ All files processed successfully!")
     else:
         messagebox.showwarning(
             "No Files Processed",
@@ -492,7 +900,61 @@ def main():
             "Please ensure your folder contains files ending with:\n" +
             "'_Observations_with_Pittsburgh_Scale.csv'"
         )
-        print("\n⚠️  No files were processed.")
+    root.destroy()
+
+def main(argv=None):
+    """Main function to run the time series generator"""
+    args = parse_args(argv)
+    
+    print("\n" + "="*70)
+    print(" PITTSBURGH AGITATION SCALE - TIME SERIES GENERATOR ")
+    print("="*70)
+    
+    # Without a folder argument, fall back to the interactive dialogs
+    interactive = args.folder is None
+    if interactive:
+        print("\n📋 INSTRUCTIONS:")
+        print("   1. This tool converts Pittsburgh Scale observations to time series data")
+        print("   2. It creates 1-second resolution data with annotated visualizations")
+        print("   3. ALL annotations displayed at the same level with 45-degree rotation")
+        print("   4. You need to select the folder containing your processed observation files")
+        print("   5. Files must end with '_Observations_with_Pittsburgh_Scale.csv'")
+        print("\n" + "-"*70)
+        
+        folder_path = ask_for_folder()
+        if not folder_path:
+            print("\n❌ No folder selected. Exiting.")
+            return 1
+    else:
+        folder_path = args.folder
+    
+    print(f"\n📁 Selected folder: {folder_path}")
+    print("-"*70)
+    
+    if args.db and not os.path.exists(os.path.join(folder_path, RATING_DATABASE_NAME)):
+        print(f"\n❌ No rating database ({RATING_DATABASE_NAME}) in {folder_path}")
+        return 1
+    
+    # Plots are only saved to files, never shown
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    
+    # Create generator and process folder
+    generator = PittsburghTimeSeriesGenerator(
+        output_format=args.output_format,
+        table_format=args.table_format,
+        plot_mode=args.plot_mode,
+        database=folder_path if args.db else None,
+    )
+    processed_files = generator.process_folder(folder_path, workers=args.workers, force=args.force)
+    
+    if interactive:
+        show_result_dialog(processed_files)
+    
+    if processed_files:
+        print("\n✅ All files processed successfully!")
+        return 0
+    print("\n⚠️  No files were processed.")
+    return 1
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Per-file render time of PAS_Plotter's dense and step plotting paths.
+
+Builds a synthetic rated session, then renders its annotated plot from the
+dense 1-second series and from the change points.
+
+Usage: python benchmarks/bench_plot_render.py [--hours 3] [--observations 120] [--repeat 3]
+"""
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import matplotlib
+matplotlib.use('Agg')
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PAS_Plotter import PittsburghTimeSeriesGenerator
+
+
+def write_session(folder, hours, observations):
+    """Write a rated observation file spanning the given number of hours"""
+    session_dir = os.path.join(folder, 'August 5 Morning AN 000133')
+    os.makedirs(session_dir)
+    
+    step = int(hours * 3600 / observations)
+    rows = []
+    for i in range(observations):
+        seconds = 9 * 3600 + i * step
+        rows.append({
+            'Time': f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}",
+            'Song': random.choice(['Moon River', 'Blue Skies', None]),
+            'Score': random.choice(['', '3']),
+            'Observations': random.choice(['sitting calmly', 'pacing around', 'refused care']),
+            'Aberrant_Vocalization': random.choice([0, 0, 0, 1, 2]),
+            'Motor_Agitation': random.choice([0, 0, 1, 3]),
+            'Aggressiveness': random.choice([0, 0, 0, 1]),
+            'Resisting_Care': random.choice([0, 0, 2]),
+            'Duration_Seconds': step,
+        })
+    
+    path = os.path.join(session_dir, 'Session_Observations_with_Pittsburgh_Scale.csv')
+    pd.DataFrame(rows).to_csv(path, index=False)
+    return path
+
+
+def time_render(generator, data, obs_df, obs_file, save_path, repeat):
+    """Return the best of several render times in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            generator.plot_time_series_with_annotations(data, obs_df, obs_file, save_path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hours', type=float, default=3, help='session length in hours')
+    parser.add_argument('--observations', type=int, default=120, help='rated observations in the session')
+    parser.add_argument('--repeat', type=int, default=3, help='renders per mode; the best is reported')
+    args = parser.parse_args()
+    
+    random.seed(0)
+    generator = PittsburghTimeSeriesGenerator()
+    
+    with tempfile.TemporaryDirectory() as folder:
+        obs_file = write_session(folder, args.hours, args.observations)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cp_df, obs_df = generator.observation_file_to_change_points(obs_file)
+        ts_df = generator.expand_change_points(cp_df)
+        save_path = generator.output_paths(obs_file)[0]
+        
+        print(f"Session: {args.hours:g} h, {args.observations} observations")
+        for mode, data in (('dense', ts_df), ('step', cp_df)):
+            seconds = time_render(generator, data, obs_df, obs_file, save_path, args.repeat)
+            print(f"  {mode:>5}: {seconds:6.2f} s per file, {len(data):>6} points per series")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Startup time of the three tools, measured with python -X importtime.
+
+Imports each script as a module in a fresh interpreter and reports the total
+import time, the slowest top-level imports and whether a heavy library
+(pandas, numpy, matplotlib) was loaded before it was needed. Also times
+`script --help`, i.e. how long argument parsing takes to appear.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--top 5] [--max-ms 300]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+SCRIPTS = ['PAS_Helper', 'PAS_Plotter', 'Music_without_Score_Finder']
+
+HEAVY_MODULES = ['pandas', 'numpy', 'matplotlib']
+
+# "import time:      1234 |      5678 |   package.module"
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \| *(\S+)$')
+
+
+def import_profile(module):
+    """Return {module: cumulative microseconds} and the heavy modules loaded, for importing module in a fresh interpreter"""
+    # Report which heavy modules actually executed; a lazy module keeps its
+    # placeholder type until first use, and type() doesn't trigger loading
+    code = (f"import sys, {module}\n"
+            f"loaded = [m for m in {HEAVY_MODULES!r} if type(sys.modules.get(m)) is type(sys)]\n"
+            f"print(','.join(loaded))")
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(3)] = int(match.group(2))
+    loaded = [m for m in result.stdout.strip().split(',') if m]
+    return cumulative, loaded
+
+
+def time_help(script, repeat):
+    """Return the best wall-clock time in seconds of running script --help"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, f"{script}.py", '--help'],
+                       cwd=ROOT, capture_output=True, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per script; the best is reported')
+    parser.add_argument('--top', type=int, default=5, help='slowest imports listed per script')
+    parser.add_argument('--max-ms', type=float,
+                        help='exit with status 1 if any script imports slower than this')
+    args = parser.parse_args()
+
+    regressions = []
+    for script in SCRIPTS:
+        # Best of several runs, per module, to smooth out disk cache effects
+        profiles = [import_profile(script) for _ in range(args.repeat)]
+        cumulative = {}
+        for profile, _ in profiles:
+            for name, us in profile.items():
+                cumulative[name] = min(us, cumulative.get(name, us))
+        loaded = profiles[-1][1]
+        total_ms = cumulative[script] / 1000
+        help_ms = time_help(script, args.repeat) * 1000
+
+        print(f"{script}: import {total_ms:7.1f} ms, --help {help_ms:7.1f} ms")
+        print(f"  heavy modules loaded at import: {', '.join(loaded) or 'none'}")
+        slowest = sorted(cumulative.items(), key=lambda item: -item[1])
+        for name, us in [item for item in slowest if item[0] != script][:args.top]:
+            print(f"  {us / 1000:7.1f} ms  {name}")
+
+        if args.max_ms is not None and total_ms > args.max_ms:
+            regressions.append(script)
+
+    if regressions:
+        print(f"\nSlower than {args.max_ms:g} ms: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())